@@ -0,0 +1,170 @@
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from triangle_func import get_triangle_type, classify_triangles, IncorrectTriangleSides
+from triangle_class import Triangle, TriangleBatch, IncorrectTriangleSides as IncorrectClassSides
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Микробенчмарки реализаций треугольника.
+# Для каждого случая печатается время на одну операцию (ns/op) и пиковый
+# объем памяти за один прогон всего входа (peak KiB/run, по tracemalloc).
+# Пик — это максимум одновременно занятой памяти, а не сумма всех выделений:
+# у поэлементных случаев объекты освобождаются сразу после вызова, поэтому
+# их пик мал, а у пакетных в него входят промежуточные массивы.
+#
+#   python bench_triangle.py                        — прогнать и напечатать
+#   python bench_triangle.py --save baseline.json   — сохранить базовую линию
+#   python bench_triangle.py --compare baseline.json --threshold 0.2
+#       — завершиться с кодом 1, если какой-то случай стал медленнее
+#         базовой линии или его пик памяти вырос больше чем на 20%
+
+SIZES = [1_000, 100_000]
+QUICK_SIZES = [1_000]
+# Рост пика памяти меньше этого порога не считается регрессией (шум tracemalloc)
+MEMORY_NOISE_BYTES = 4096
+
+
+def make_triples(kind, n, seed=0):
+    rng = random.Random(seed)
+    triples = []
+    for _ in range(n):
+        if kind.startswith("int"):
+            a, b = rng.randint(1, 1000), rng.randint(1, 1000)
+            c = rng.randint(abs(a - b) + 1, a + b - 1) if kind == "int_valid" else a + b + rng.randint(0, 10)
+        else:
+            a, b = rng.uniform(1, 1000), rng.uniform(1, 1000)
+            c = rng.uniform(abs(a - b), a + b) if kind == "float_valid" else a + b + rng.uniform(0, 10)
+        triples.append((a, b, c))
+    return triples
+
+
+def scalar_func(triples):
+    for a, b, c in triples:
+        try:
+            get_triangle_type(a, b, c)
+        except IncorrectTriangleSides:
+            pass
+
+
+def class_construct(triples):
+    for a, b, c in triples:
+        try:
+            Triangle(a, b, c).triangle_type()
+        except IncorrectClassSides:
+            pass
+
+
+def batch_class(triples):
+    typecode = "q" if isinstance(triples[0][0], int) else "d"
+    TriangleBatch.from_triples(triples, typecode=typecode, validate=False).types()
+
+
+def batch_numpy(sides):
+    classify_triangles(sides)
+
+
+# (название, функция, подготовка входа из списка троек)
+CASES = [
+    ("scalar_func", scalar_func, None),
+    ("class_construct", class_construct, None),
+    ("batch_class", batch_class, None),
+]
+if np is not None:
+    CASES.append(("batch_numpy", batch_numpy, np.array))
+
+KINDS = ["int_valid", "int_invalid", "float_valid", "float_invalid"]
+
+
+def measure(func, data, n, min_time):
+    # Повторяем прогон, пока суммарно не наберется min_time, берем лучший
+    best = None
+    spent = 0
+    repeats = 0
+    while spent < min_time * 1e9 or repeats < 3:
+        start = time.perf_counter_ns()
+        func(data)
+        elapsed = time.perf_counter_ns() - start
+        spent += elapsed
+        repeats += 1
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    try:
+        func(data)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"ns_per_op": best / n, "peak_bytes_per_run": peak, "repeats": repeats}
+
+
+def run(sizes, pattern, min_time):
+    results = {}
+    for size in sizes:
+        for kind in KINDS:
+            triples = make_triples(kind, size)
+            for name, func, prepare in CASES:
+                key = f"{name}/{kind}/{size}"
+                if pattern and pattern not in key:
+                    continue
+                data = prepare(triples) if prepare else triples
+                results[key] = measure(func, data, size, min_time)
+                r = results[key]
+                print(f"{key:40s} {r['ns_per_op']:12.1f} ns/op {r['peak_bytes_per_run'] / 1024:10.1f} peak KiB/run")
+    return results
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        ratio = result["ns_per_op"] / base["ns_per_op"]
+        if ratio > 1 + threshold:
+            regressions.append((key, "ns/op", base["ns_per_op"], result["ns_per_op"]))
+        # В базовых линиях старого формата пика за прогон нет
+        old_peak = base.get("peak_bytes_per_run")
+        new_peak = result["peak_bytes_per_run"]
+        if old_peak is not None and new_peak - old_peak > max(old_peak * threshold, MEMORY_NOISE_BYTES):
+            regressions.append((key, "peak B/run", old_peak, new_peak))
+    for key, unit, old, new in regressions:
+        ratio = f"x{new / old:.2f}" if old else "было 0"
+        print(f"РЕГРЕССИЯ {key}: {old:.1f} -> {new:.1f} {unit} ({ratio})")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Микробенчмарки реализаций треугольника")
+    parser.add_argument("--save", help="сохранить результаты как базовую линию (JSON)")
+    parser.add_argument("--compare", help="сравнить с базовой линией (JSON)")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="допустимое замедление и рост пика памяти относительно базовой линии (доля, по умолчанию 0.2)")
+    parser.add_argument("--filter", default="", help="запускать только случаи, содержащие подстроку")
+    parser.add_argument("--min-time", type=float, default=0.2, help="минимальное время на случай (секунды)")
+    parser.add_argument("--quick", action="store_true", help="только малые размеры входа")
+    args = parser.parse_args(argv)
+
+    results = run(QUICK_SIZES if args.quick else SIZES, args.filter, args.min_time)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"python": platform.python_version(), "benchmarks": results}, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["benchmarks"]
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
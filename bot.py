@@ -8,17 +8,54 @@ from decimal import Decimal, InvalidOperation
 import asyncio
 import psycopg2
 from psycopg2 import sql
-import requests
+import aiohttp
 
 # Настройки бота
 TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
-bot = Bot(token=TOKEN)
+# Бот создается в main(), чтобы импорт модуля не требовал токена
 dp = Dispatcher()
 
 # URL микросервисов
 CURRENCY_MANAGER_URL = 'http://localhost:5001'
 DATA_MANAGER_URL = 'http://localhost:5002'
 
+# Параметры HTTP-клиента: пул keep-alive соединений и таймауты
+HTTP_POOL_LIMIT = int(os.getenv('HTTP_POOL_LIMIT', '100'))
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv('HTTP_POOL_LIMIT_PER_HOST', '20'))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv('HTTP_KEEPALIVE_TIMEOUT', '30'))
+HTTP_TIMEOUT = aiohttp.ClientTimeout(
+    total=float(os.getenv('HTTP_TIMEOUT', '10')),
+    connect=float(os.getenv('HTTP_CONNECT_TIMEOUT', '3'))
+)
+
+# Общая сессия создается в main() и закрывается при остановке бота
+http_session = None
+
+def create_http_session():
+    connector = aiohttp.TCPConnector(
+        limit=HTTP_POOL_LIMIT,
+        limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+        keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=HTTP_TIMEOUT)
+
+# Запрос к микросервису: возвращает код ответа и JSON. Если тело ответа
+# не JSON (например, HTML-страница ошибки), возвращается словарь с 'error',
+# а успешный код заменяется на 502, чтобы обработчики не считали ответ удачным
+async def call_service(method, url, **kwargs):
+    try:
+        async with http_session.request(method, url, **kwargs) as response:
+            try:
+                data = await response.json(content_type=None)
+            except ValueError:
+                data = None
+            if data is None:
+                status = response.status if response.status >= 400 else 502
+                return status, {'error': f'Некорректный ответ сервиса (код {response.status})'}
+            return response.status, data
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        return 503, {'error': 'Сервис недоступен'}
+
 # Состояния для FSM
 class CurrencyStates(StatesGroup):
     waiting_for_name = State()
@@ -80,11 +117,11 @@ async def process_currency_name(message: Message, state: FSMContext):
     await state.update_data(currency_name=currency_name)
     
     if action == "delete_currency":
-        response = requests.post(f"{CURRENCY_MANAGER_URL}/delete", json={'name': currency_name})
-        if response.status_code == 200:
+        status, result = await call_service('POST', f"{CURRENCY_MANAGER_URL}/delete", json={'name': currency_name})
+        if status == 200:
             await message.answer(f"Валюта {currency_name} успешно удалена")
         else:
-            await message.answer(f"Ошибка: {response.json().get('error')}")
+            await message.answer(f"Ошибка: {result.get('error')}")
         await state.clear()
     elif action == "add_currency":
         await state.set_state(CurrencyStates.waiting_for_rate)
@@ -101,11 +138,11 @@ async def process_currency_rate(message: Message, state: FSMContext):
         data = await state.get_data()
         currency_name = data['currency_name']
         
-        response = requests.post(f"{CURRENCY_MANAGER_URL}/load", json={'name': currency_name, 'rate': float(rate)})
-        if response.status_code == 200:
+        status, result = await call_service('POST', f"{CURRENCY_MANAGER_URL}/load", json={'name': currency_name, 'rate': float(rate)})
+        if status == 200:
             await message.answer(f"Валюта {currency_name} успешно добавлена")
         else:
-            await message.answer(f"Ошибка: {response.json().get('error')}")
+            await message.answer(f"Ошибка: {result.get('error')}")
         
         await state.clear()
     except (ValueError, InvalidOperation):
@@ -119,11 +156,11 @@ async def process_new_rate(message: Message, state: FSMContext):
         data = await state.get_data()
         currency_name = data['currency_name']
         
-        response = requests.post(f"{CURRENCY_MANAGER_URL}/update_currency", json={'name': currency_name, 'rate': float(new_rate)})
-        if response.status_code == 200:
+        status, result = await call_service('POST', f"{CURRENCY_MANAGER_URL}/update_currency", json={'name': currency_name, 'rate': float(new_rate)})
+        if status == 200:
             await message.answer(f"Курс валюты {currency_name} успешно обновлен")
         else:
-            await message.answer(f"Ошибка: {response.json().get('error')}")
+            await message.answer(f"Ошибка: {result.get('error')}")
         
         await state.clear()
     except (ValueError, InvalidOperation):
@@ -132,9 +169,8 @@ async def process_new_rate(message: Message, state: FSMContext):
 # Команда /get_currencies
 @dp.message(Command("get_currencies"))
 async def get_currencies(message: Message):
-    response = requests.get(f"{DATA_MANAGER_URL}/currencies")
-    if response.status_code == 200:
-        currencies = response.json()
+    status, currencies = await call_service('GET', f"{DATA_MANAGER_URL}/currencies")
+    if status == 200:
         if currencies:
             message_text = "Список валют:\n"
             for currency in currencies:
@@ -160,12 +196,12 @@ async def process_convert_amount(message: Message, state: FSMContext):
         data = await state.get_data()
         currency_name = data['currency_name']
         
-        response = requests.get(f"{DATA_MANAGER_URL}/convert", params={'currency': currency_name, 'amount': float(amount)})
-        if response.status_code == 200:
-            converted_amount = response.json().get('converted_amount')
+        status, result = await call_service('GET', f"{DATA_MANAGER_URL}/convert", params={'currency': currency_name, 'amount': str(amount)})
+        if status == 200:
+            converted_amount = result.get('converted_amount')
             await message.answer(f"{amount} {currency_name} = {converted_amount} RUB")
         else:
-            await message.answer(f"Ошибка: {response.json().get('error')}")
+            await message.answer(f"Ошибка: {result.get('error')}")
         
         await state.clear()
     except (ValueError, InvalidOperation):
@@ -181,7 +217,13 @@ async def process_convert_name(message: Message, state: FSMContext):
         await message.answer("Введите сумму для конвертации:")
 
 async def main():
-    await dp.start_polling(bot)
+    global http_session
+    bot = Bot(token=TOKEN)
+    http_session = create_http_session()
+    try:
+        await dp.start_polling(bot)
+    finally:
+        await http_session.close()
 
 if __name__ == '__main__':
     asyncio.run(main())
\ No newline at end of file
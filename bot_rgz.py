@@ -1,31 +1,143 @@
 import os
 import asyncio
-import requests
+import logging
+import aiohttp
 import json
-from aiogram import Bot, Dispatcher, types
-from aiogram.filters.command import Command
+import html
+import io
+import csv
+import gzip
+import tempfile
+from collections import OrderedDict
+from itertools import groupby
+from operator import itemgetter
+from datetime import date as Date
+from aiogram import Bot, Dispatcher, F, types
+from aiogram.filters.command import Command, CommandObject
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.fsm.context import FSMContext
-from aiogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardRemove
+from aiogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardRemove, FSInputFile
 from decimal import Decimal, InvalidOperation
-import psycopg2
-
-# Бот и диспетчер
-bot = Bot(token=os.getenv("BOT_TOKEN"))
+import psycopg
+from psycopg_pool import AsyncConnectionPool
+from membership_cache import MembershipCache
+from bot_timing import Timings, install_timing, pool_configure
+from message_split import split_messages
+from operations_import import iter_operations
+from write_behind import WriteBehindBuffer
+from report_period import parse_report_args, covers_whole_months
+
+# Диспетчер; бот создается в main(), чтобы импорт модуля не требовал токена
 dp = Dispatcher()
+log = logging.getLogger(__name__)
 
 # Подключение к БД
-conn = psycopg2.connect(
-    dbname="finance_db",
-    user="postgres",
-    password="postgres",
-    host="127.0.0.1",
-    port="5432"
+DB_CONFIG = {
+    "dbname": "finance_db",
+    "user": "postgres",
+    "password": "postgres",
+    "host": "127.0.0.1",
+    "port": "5432"
+}
+
+# Сервер курсов валют и параметры HTTP-клиента: общая сессия с keep-alive
+# создается в main(), таймауты не дают зависшему серверу держать обработчики
+RATE_SERVER_URL = os.getenv("RATE_SERVER_URL", "http://127.0.0.1:5001/rate")
+HTTP_TIMEOUT = aiohttp.ClientTimeout(
+    total=float(os.getenv("HTTP_TIMEOUT", "10")),
+    connect=float(os.getenv("HTTP_CONNECT_TIMEOUT", "3"))
 )
+http_session = None
+
+def create_http_session():
+    return aiohttp.ClientSession(timeout=HTTP_TIMEOUT)
+
+# Размер пула соединений и время ожидания свободного соединения (секунды)
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+
+# Замеры обработчиков, вызовов Bot API и SQL (см. bot_timing.py)
+timings = Timings()
+
+# Пул создается в main(). Соединения проверяются перед выдачей,
+# разорванные заменяются новыми автоматически.
+pool = None
+
+def create_pool():
+    return AsyncConnectionPool(
+        kwargs={**DB_CONFIG, "autocommit": True},
+        min_size=DB_POOL_MIN,
+        max_size=DB_POOL_MAX,
+        timeout=DB_POOL_TIMEOUT,
+        check=AsyncConnectionPool.check_connection,
+        configure=pool_configure(timings),
+        open=False
+    )
 
+async def db_fetchone(query, params=()):
+    async with pool.connection() as conn:
+        cur = await conn.execute(query, params)
+        return await cur.fetchone()
+
+async def db_fetchall(query, params=()):
+    async with pool.connection() as conn:
+        cur = await conn.execute(query, params)
+        return await cur.fetchall()
+
+# Выполняет запрос и возвращает число затронутых строк
+async def db_execute(query, params=()):
+    async with pool.connection() as conn:
+        cur = await conn.execute(query, params)
+        return cur.rowcount
+
+# Просмотр операций: валюты и размер страницы
+CURRENCIES = ["RUB", "EUR", "USD"]
+PAGE_SIZE = int(os.getenv("OPERATIONS_PAGE_SIZE", "20"))
+CENT = Decimal("0.01")
+
+# Кэш зарегистрированных пользователей: прогревается в main(),
+# пополняется при /reg; отрицательные ответы живут USER_CACHE_NEGATIVE_TTL секунд
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "100000"))
+registered_users = MembershipCache(
+    max_size=USER_CACHE_SIZE,
+    negative_ttl=float(os.getenv("USER_CACHE_NEGATIVE_TTL", "30"))
+)
 
-conn.autocommit = True
-cursor = conn.cursor()
+async def warm_user_cache():
+    rows = await db_fetchall("SELECT chat_id FROM users ORDER BY id DESC LIMIT %s", (USER_CACHE_SIZE,))
+    registered_users.load(row[0] for row in reversed(rows))
+
+# Категории пользователей (название -> id) по chat_id, LRU на
+# CATEGORY_CACHE_SIZE чатов; запись сбрасывается при /add_category
+CATEGORY_CACHE_SIZE = int(os.getenv("CATEGORY_CACHE_SIZE", "10000"))
+CATEGORY_KEYBOARD_LIMIT = 50
+category_cache = OrderedDict()
+
+async def get_categories(chat_id):
+    categories = category_cache.get(chat_id)
+    if categories is not None:
+        category_cache.move_to_end(chat_id)
+        return categories
+    rows = await db_fetchall("SELECT name, id FROM categories WHERE chat_id = %s ORDER BY name", (chat_id,))
+    categories = dict(rows)
+    category_cache[chat_id] = categories
+    if len(category_cache) > CATEGORY_CACHE_SIZE:
+        category_cache.popitem(last=False)
+    return categories
+
+def invalidate_categories(chat_id):
+    category_cache.pop(chat_id, None)
+
+# Клавиатура выбора категории: по две кнопки в ряд, callback "cat:<id>"
+def categories_keyboard(categories):
+    buttons = [
+        InlineKeyboardButton(text=name, callback_data=f"cat:{cat_id}")
+        for name, cat_id in list(categories.items())[:CATEGORY_KEYBOARD_LIMIT]
+    ]
+    if not buttons:
+        return None
+    return InlineKeyboardMarkup(inline_keyboard=[buttons[i:i + 2] for i in range(0, len(buttons), 2)])
 
 # FSM состояния
 class Registration(StatesGroup):
@@ -40,10 +152,17 @@ class OperationFSM(StatesGroup):
 class CategoryFSM(StatesGroup):
     waiting_for_name = State()
 
+class ImportFSM(StatesGroup):
+    waiting_for_file = State()
+
 # Проверка регистрации
-def is_registered(chat_id):
-    cursor.execute("SELECT 1 FROM users WHERE chat_id = %s", (chat_id,))
-    return cursor.fetchone() is not None
+async def is_registered(chat_id):
+    cached = registered_users.get(chat_id)
+    if cached is not None:
+        return cached
+    found = await db_fetchone("SELECT 1 FROM users WHERE chat_id = %s", (chat_id,)) is not None
+    registered_users.set(chat_id, found)
+    return found
 
 # Обработчик команды /start
 @dp.message(Command("start"))
@@ -54,7 +173,10 @@ async def cmd_start(message: Message):
         "/reg - регистрация\n"
         "/add_category - добавить категорию\n"
         "/add_operation - добавить операцию\n"
-        "/operations - просмотр операций"
+        "/import - загрузить операции из CSV-файла\n"
+        "/export - выгрузить операции в CSV-файл\n"
+        "/operations - просмотр операций\n"
+        "/operations 30d week - отчет за период с группировкой"
     )
 
 # Команда /reg — регистрация
@@ -63,8 +185,7 @@ async def cmd_reg(message: types.Message, state: FSMContext):
     chat_id = message.chat.id
 
     # Проверка, зарегистрирован ли пользователь
-    cursor.execute("SELECT * FROM users WHERE chat_id = %s", (chat_id,))
-    if cursor.fetchone():
+    if await is_registered(chat_id):
         await message.answer("Вы уже зарегистрированы.")
         return
 
@@ -78,8 +199,8 @@ async def process_login(message: types.Message, state: FSMContext):
     chat_id = message.chat.id
 
     # Сохраняем логин и chat_id
-    cursor.execute("INSERT INTO users (chat_id, name) VALUES (%s, %s)", (chat_id, login))
-    conn.commit()
+    await db_execute("INSERT INTO users (chat_id, name) VALUES (%s, %s)", (chat_id, login))
+    registered_users.add(chat_id)
 
     await message.answer("Вы успешно зарегистрированы!", reply_markup=ReplyKeyboardRemove())
     await state.clear()
@@ -87,7 +208,7 @@ async def process_login(message: types.Message, state: FSMContext):
 # /add_category
 @dp.message(Command("add_category"))
 async def add_category(message: Message, state: FSMContext):
-    if not is_registered(message.chat.id):
+    if not await is_registered(message.chat.id):
         await message.answer("Сначала зарегистрируйтесь с помощью /reg")
         return
     await message.answer("Введите название новой категории:")
@@ -95,14 +216,21 @@ async def add_category(message: Message, state: FSMContext):
 
 @dp.message(CategoryFSM.waiting_for_name)
 async def save_category(message: Message, state: FSMContext):
-    cursor.execute("INSERT INTO categories (name, chat_id) VALUES (%s, %s)", (message.text, message.chat.id))
-    await message.answer("Категория успешно добавлена!")
+    inserted = await db_execute(
+        "INSERT INTO categories (name, chat_id) VALUES (%s, %s) ON CONFLICT (chat_id, name) DO NOTHING",
+        (message.text, message.chat.id)
+    )
+    if inserted == 0:
+        await message.answer("Такая категория уже есть.")
+    else:
+        invalidate_categories(message.chat.id)
+        await message.answer("Категория успешно добавлена!")
     await state.clear()
 
 # /add_operation
 @dp.message(Command("add_operation"))
 async def start_add_operation(message: Message, state: FSMContext):
-    if not is_registered(message.chat.id):
+    if not await is_registered(message.chat.id):
         await message.answer("Сначала зарегистрируйтесь с помощью /reg")
         return
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
@@ -132,33 +260,280 @@ async def set_amount(message: Message, state: FSMContext):
 
 @dp.message(OperationFSM.waiting_for_date)
 async def set_date(message: Message, state: FSMContext):
-    await state.update_data(date=message.text)
-    await message.answer("Введите категорию операции:")
+    try:
+        op_date = Date.fromisoformat((message.text or "").strip())
+    except ValueError:
+        await message.answer("Введите дату в формате YYYY-MM-DD.")
+        return
+    await state.update_data(date=op_date.isoformat())
+    keyboard = categories_keyboard(await get_categories(message.chat.id))
+    if keyboard is None:
+        await message.answer("Введите категорию операции:")
+    else:
+        await message.answer("Выберите категорию или введите ее название:", reply_markup=keyboard)
     await state.set_state(OperationFSM.waiting_for_category)
 
+# Отложенная запись операций (WRITE_BEHIND=1): вставки от всех чатов
+# собираются в пачки до WRITE_BEHIND_MAX_ROWS строк или на
+# WRITE_BEHIND_MAX_DELAY_MS миллисекунд и пишутся одной транзакцией.
+# Пользователь получает ответ после фиксации пачки, при остановке бота
+# буфер дописывается до закрытия пула.
+WRITE_BEHIND = os.getenv("WRITE_BEHIND", "0") == "1"
+WRITE_BEHIND_MAX_ROWS = int(os.getenv("WRITE_BEHIND_MAX_ROWS", "500"))
+WRITE_BEHIND_MAX_DELAY_MS = float(os.getenv("WRITE_BEHIND_MAX_DELAY_MS", "50"))
+
+INSERT_OPERATION = (
+    "INSERT INTO operations (date, sum, chat_id, type_operation, category_id) VALUES (%s, %s, %s, %s, %s)"
+)
+
+operation_writer = None
+
+# Пачка операций одним INSERT ... SELECT FROM unnest: один оператор,
+# поэтому триггеры сводных таблиц срабатывают один раз на пачку.
+# Если пачку отвергли данные одной из строк (DataError, IntegrityError —
+# например, категория удалена в это время), строки пишутся по одной, и ошибку
+# получает только виновная. Остальные ошибки (недоступная база, таймаут пула)
+# сразу возвращаются всей пачке: повтор по строкам только увеличил бы задержку.
+async def insert_operations(rows):
+    columns = [list(column) for column in zip(*rows)]
+    try:
+        async with pool.connection() as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    "INSERT INTO operations (date, sum, chat_id, type_operation, category_id) "
+                    "SELECT * FROM unnest(%s::date[], %s::numeric[], %s::bigint[], %s::text[], %s::integer[])",
+                    columns
+                )
+        return [None] * len(rows)
+    except (psycopg.DataError, psycopg.IntegrityError):
+        if len(rows) == 1:
+            raise
+    results = []
+    for row in rows:
+        try:
+            await db_execute(INSERT_OPERATION, row)
+            results.append(None)
+        except (psycopg.DataError, psycopg.IntegrityError) as e:
+            results.append(e)
+        except psycopg.Error as e:
+            # База стала недоступна: оставшиеся строки получают ту же ошибку
+            results.extend([e] * (len(rows) - len(results)))
+            break
+    return results
+
+async def add_operation(row):
+    if operation_writer is not None:
+        await operation_writer.submit(row)
+    else:
+        await db_execute(INSERT_OPERATION, row)
+
+@dp.callback_query(OperationFSM.waiting_for_category, F.data.startswith("cat:"))
+async def choose_category(callback: types.CallbackQuery, state: FSMContext):
+    try:
+        cat_id = int(callback.data[len("cat:"):])
+    except ValueError:
+        await callback.answer()
+        return
+    categories = await get_categories(callback.message.chat.id)
+    if cat_id not in categories.values():
+        await callback.answer("Категория не найдена.")
+        return
+    await callback.answer()
+    await save_operation(callback.message, state, cat_id)
+
 @dp.message(OperationFSM.waiting_for_category)
 async def set_category(message: Message, state: FSMContext):
-    category = message.text
-    cursor.execute("SELECT id FROM categories WHERE name = %s AND chat_id = %s", (category, message.chat.id))
-    result = cursor.fetchone()
-    if not result:
-        await message.answer("Такой категории нет. Добавьте через /add_category.")
+    cat_id = (await get_categories(message.chat.id)).get(message.text)
+    if cat_id is None:
+        await message.answer("Такой категории нет. Выберите категорию кнопкой или добавьте через /add_category.")
         return
-    cat_id = result[0]
+    await save_operation(message, state, cat_id)
+
+async def save_operation(message, state, cat_id):
     data = await state.get_data()
-    cursor.execute(
-        "INSERT INTO operations (date, sum, chat_id, type_operation, category_id) VALUES (%s, %s, %s, %s, %s)",
-        (data["date"], data["sum"], message.chat.id, data["type_operation"], cat_id)
-    )
+    await state.clear()
+    try:
+        await add_operation((data["date"], data["sum"], message.chat.id, data["type_operation"], cat_id))
+    except (psycopg.Error, RuntimeError):
+        # RuntimeError — буфер отложенной записи уже закрыт (бот останавливается)
+        await message.answer("Операция не сохранена. Попробуйте еще раз: /add_operation")
+        return
     await message.answer("Операция успешно добавлена.")
+
+# Импорт операций из файла: размер файла и число примеров ошибок в отчете
+IMPORT_MAX_FILE_SIZE = int(os.getenv("IMPORT_MAX_FILE_SIZE", str(20 * 1024 * 1024)))
+IMPORT_ERROR_EXAMPLES = 10
+
+# /import
+@dp.message(Command("import"))
+async def cmd_import(message: Message, state: FSMContext):
+    if not await is_registered(message.chat.id):
+        await message.answer("Сначала зарегистрируйтесь с помощью /reg")
+        return
+    await message.answer(
+        "Отправьте CSV или TSV файл документом. Каждая строка: "
+        "дата (YYYY-MM-DD), сумма, тип (РАСХОД или ДОХОД), категория."
+    )
+    await state.set_state(ImportFSM.waiting_for_file)
+
+@dp.message(ImportFSM.waiting_for_file, F.document)
+async def process_import_file(message: Message, state: FSMContext):
+    document = message.document
+    if document.file_size and document.file_size > IMPORT_MAX_FILE_SIZE:
+        await message.answer("Файл слишком большой.")
+        return
     await state.clear()
 
-# /operations
+    with tempfile.TemporaryFile() as tmp:
+        await message.bot.download(document, destination=tmp)
+        tmp.seek(0)
+        f = io.TextIOWrapper(tmp, encoding="utf-8-sig", newline="")
+        try:
+            accepted, rejected, errors = await import_operations(message.chat.id, f)
+        except UnicodeDecodeError:
+            await message.answer("Файл должен быть в кодировке UTF-8.")
+            return
+        except psycopg.Error:
+            # COPY идет в одной транзакции, поэтому при ошибке не сохраняется ничего
+            await message.answer("Не удалось сохранить операции, ни одна строка не загружена. Попробуйте позже: /import")
+            return
+
+    lines = [f"Загружено операций: {accepted}", f"Отклонено строк: {rejected}"]
+    if errors:
+        lines.append("")
+        lines.extend(errors)
+        if rejected > len(errors):
+            lines.append("...")
+    await message.answer("\n".join(lines))
+
+@dp.message(ImportFSM.waiting_for_file)
+async def process_import_not_file(message: Message):
+    await message.answer("Отправьте файл документом.")
+
+# Загружает операции из файла одним COPY в одной транзакции. Категории
+# пользователя берутся из кэша (или читаются одним запросом); строки с ошибками и с неизвестными
+# категориями пропускаются. Возвращает (загружено, отклонено, примеры ошибок)
+async def import_operations(chat_id, f):
+    categories = await get_categories(chat_id)
+    accepted = 0
+    rejected = 0
+    errors = []
+
+    def reject(line_no, reason):
+        nonlocal rejected
+        rejected += 1
+        if len(errors) < IMPORT_ERROR_EXAMPLES:
+            errors.append(f"Строка {line_no}: {reason}")
+
+    async with pool.connection() as conn:
+        async with conn.transaction():
+            async with conn.cursor() as cur:
+                async with cur.copy(
+                    "COPY operations (date, sum, chat_id, type_operation, category_id) FROM STDIN"
+                ) as copy:
+                    for line_no, operation, error in iter_operations(f):
+                        if error:
+                            reject(line_no, error)
+                            continue
+                        op_date, amount, op_type, category = operation
+                        cat_id = categories.get(category)
+                        if cat_id is None:
+                            reject(line_no, f"нет категории {category!r}, добавьте через /add_category")
+                            continue
+                        await copy.write_row((op_date, amount, chat_id, op_type, cat_id))
+                        accepted += 1
+    return accepted, rejected, errors
+
+# Выгрузка: строки читаются именованным (серверным) курсором порциями
+# по EXPORT_FETCH_SIZE и сразу пишутся в файл, поэтому память бота
+# не зависит от размера истории
+EXPORT_FETCH_SIZE = int(os.getenv("EXPORT_FETCH_SIZE", "2000"))
+
+# Аргументы /export: валюта, дата начала, дата конца и gz — в любом порядке
+def parse_export_args(args):
+    currency = "RUB"
+    dates = []
+    compress = False
+    for token in (args or "").split():
+        if token.upper() in CURRENCIES:
+            currency = token.upper()
+        elif token.lower() in ("gz", "gzip"):
+            compress = True
+        else:
+            dates.append(Date.fromisoformat(token))
+    if len(dates) > 2:
+        raise ValueError("Слишком много дат")
+    date_from = dates[0] if dates else None
+    date_to = dates[1] if len(dates) > 1 else None
+    return currency, date_from, date_to, compress
+
+# Пишет операции пользователя в файл path и возвращает число строк
+async def export_operations(chat_id, path, currency, rate, date_from=None, date_to=None, compress=False):
+    opener = gzip.open if compress else open
+    written = 0
+    async with pool.connection() as conn:
+        async with conn.transaction():
+            async with conn.cursor(name="export_operations") as cur:
+                cur.itersize = EXPORT_FETCH_SIZE
+                await cur.execute(
+                    "SELECT o.date, o.sum, o.type_operation, c.name FROM operations o "
+                    "LEFT JOIN categories c ON c.id = o.category_id "
+                    "WHERE o.chat_id = %s "
+                    "AND o.date >= COALESCE(%s::date, '-infinity') AND o.date <= COALESCE(%s::date, 'infinity') "
+                    "ORDER BY o.date, o.id",
+                    (chat_id, date_from, date_to)
+                )
+                with opener(path, "wt", encoding="utf-8", newline="") as f:
+                    writer = csv.writer(f)
+                    writer.writerow(["date", "sum", "currency", "type", "category"])
+                    async for op_date, amount, op_type, category in cur:
+                        writer.writerow([op_date, (amount / rate).quantize(CENT), currency, op_type, category or ""])
+                        written += 1
+    return written
+
+# /export [валюта] [с YYYY-MM-DD] [по YYYY-MM-DD] [gz]
+@dp.message(Command("export"))
+async def cmd_export(message: Message, command: CommandObject):
+    if not await is_registered(message.chat.id):
+        await message.answer("Сначала зарегистрируйтесь с помощью /reg")
+        return
+    try:
+        currency, date_from, date_to, compress = parse_export_args(command.args)
+    except ValueError:
+        await message.answer("Формат: /export [RUB|EUR|USD] [YYYY-MM-DD] [YYYY-MM-DD] [gz]")
+        return
+    rate, error = await fetch_rate(currency)
+    if error:
+        await message.answer(error)
+        return
+
+    filename = f"operations_{currency}.csv" + (".gz" if compress else "")
+    fd, path = tempfile.mkstemp(suffix=".gz" if compress else ".csv")
+    os.close(fd)
+    try:
+        try:
+            written = await export_operations(message.chat.id, path, currency, rate, date_from, date_to, compress)
+        except psycopg.Error:
+            log.exception("Выгрузка операций для chat_id=%s не удалась", message.chat.id)
+            await message.answer("Не удалось выгрузить операции. Попробуйте позже: /export")
+            return
+        if written == 0:
+            await message.answer("Нет операций за выбранный период.")
+            return
+        await message.answer_document(FSInputFile(path, filename=filename), caption=f"Операций: {written}")
+    finally:
+        os.unlink(path)
+
+# /operations — просмотр операций; с аргументами — отчет за период:
+# /operations <month|Nd|YYYY-MM|YYYY|YYYY-MM-DD YYYY-MM-DD> [day|week|month|category] [валюта]
 @dp.message(Command("operations"))
-async def get_operations(message: Message):
-    if not is_registered(message.chat.id):
+async def get_operations(message: Message, command: CommandObject):
+    if not await is_registered(message.chat.id):
         await message.answer("Сначала зарегистрируйтесь.")
         return
+    if command.args:
+        await show_period_report(message, command.args)
+        return
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="RUB", callback_data="RUB")],
         [InlineKeyboardButton(text="EUR", callback_data="EUR")],
@@ -166,61 +541,260 @@ async def get_operations(message: Message):
     ])
     await message.answer("Выберите валюту:", reply_markup=keyboard)
 
-@dp.callback_query()
-async def handle_currency(callback: types.CallbackQuery):
-    currency = callback.data
+REPORT_USAGE = (
+    "Формат: /operations <период> [группировка] [валюта]\n"
+    "Период: month, 30d, 2024-05, 2024 или две даты YYYY-MM-DD\n"
+    "Группировка: day, week, month, category"
+)
+NO_CATEGORY = "Без категории"
+
+# Суммы по (группа, тип) считаются в базе: date_trunc и GROUP BY по
+# диапазону индекса (chat_id, date, id). Для группировок по месяцам и
+# категориям за целые месяцы читается сводная таблица monthly_totals;
+# строки, обнулившиеся после удаления операций, в отчет не попадают.
+async def fetch_period_report(chat_id, date_from, date_to, grouping):
+    if grouping in ("month", "category") and covers_whole_months(date_from, date_to):
+        if grouping == "month":
+            return await db_fetchall(
+                "SELECT month, type_operation, SUM(total) FROM monthly_totals "
+                "WHERE chat_id = %s AND month BETWEEN %s AND %s GROUP BY 1, 2 "
+                "HAVING SUM(operations_count) <> 0 ORDER BY 1, 2",
+                (chat_id, date_from, date_to)
+            )
+        return await db_fetchall(
+            "SELECT COALESCE(c.name, %s), m.type_operation, SUM(m.total) FROM monthly_totals m "
+            "LEFT JOIN categories c ON c.id = m.category_id "
+            "WHERE m.chat_id = %s AND m.month BETWEEN %s AND %s GROUP BY 1, 2 "
+            "HAVING SUM(m.operations_count) <> 0 ORDER BY 1, 2",
+            (NO_CATEGORY, chat_id, date_from, date_to)
+        )
+    if grouping == "category":
+        return await db_fetchall(
+            "SELECT COALESCE(c.name, %s), o.type_operation, SUM(o.sum) FROM operations o "
+            "LEFT JOIN categories c ON c.id = o.category_id "
+            "WHERE o.chat_id = %s AND o.date BETWEEN %s AND %s GROUP BY 1, 2 ORDER BY 1, 2",
+            (NO_CATEGORY, chat_id, date_from, date_to)
+        )
+    return await db_fetchall(
+        "SELECT date_trunc(%s, date::timestamp)::date, type_operation, SUM(sum) FROM operations "
+        "WHERE chat_id = %s AND date BETWEEN %s AND %s GROUP BY 1, 2 ORDER BY 1, 2",
+        (grouping, chat_id, date_from, date_to)
+    )
 
-    rate = 1.0
-    if currency in ["USD", "EUR"]:
-        try:
-            response = requests.get("http://127.0.0.1:5001/rate", params={"currency": currency})
-            if response.status_code != 200:
-                await callback.message.answer("Ошибка получения курса валют.")
-                await callback.answer()
-                return
-            rate_data = response.json()
-            rate = rate_data.get("rate", 1.0)
-        except Exception:
-            await callback.message.answer("Не удалось подключиться к серверу курса валют.")
-            await callback.answer()
-            return
+def bucket_label(bucket, grouping):
+    if grouping == "category":
+        return html.escape(bucket)
+    if grouping == "month":
+        return bucket.strftime("%Y-%m")
+    if grouping == "week":
+        return f"неделя с {bucket}"
+    return str(bucket)
+
+# Строки (группа, тип, сумма) упорядочены по группе, поэтому доход и расход
+# одной группы сводятся в одну строку отчета за один проход
+def render_period_report(currency, rate, date_from, date_to, grouping, rows):
+    yield f"<b>Отчет в {currency} за {date_from} — {date_to}</b>\n\n"
+    total_income = Decimal(0)
+    total_expense = Decimal(0)
+    for bucket, group in groupby(rows, key=itemgetter(0)):
+        sums = {op_type: amount for _, op_type, amount in group}
+        income = sums.get("ДОХОД", Decimal(0))
+        expense = sums.get("РАСХОД", Decimal(0))
+        total_income += income
+        total_expense += expense
+        yield (
+            f"{bucket_label(bucket, grouping)} | "
+            f"+{(income / rate).quantize(CENT)} | -{(expense / rate).quantize(CENT)}\n"
+        )
+    yield (
+        f"\n<b>Итого:</b>\n"
+        f"Доходы: {(total_income / rate).quantize(CENT)} {currency}\n"
+        f"Расходы: {(total_expense / rate).quantize(CENT)} {currency}\n"
+        f"<b>Баланс: {((total_income - total_expense) / rate).quantize(CENT)} {currency}</b>"
+    )
 
-    # Получаем операции пользователя
-    cursor.execute("SELECT date, sum, type_operation FROM operations WHERE chat_id = %s", (callback.message.chat.id,))
-    records = cursor.fetchall()
+async def show_period_report(message, args):
+    try:
+        currency, date_from, date_to, grouping = parse_report_args(args, Date.today())
+    except ValueError:
+        await message.answer(REPORT_USAGE)
+        return
+    rate, error = await fetch_rate(currency)
+    if error:
+        await message.answer(error)
+        return
+    rows = await fetch_period_report(message.chat.id, date_from, date_to, grouping)
+    if not rows:
+        await message.answer("Нет операций за выбранный период.")
+        return
+    await send_report(message, render_period_report(currency, rate, date_from, date_to, grouping, rows))
 
-    if not records:
+# Курс валюты к рублю: возвращает (курс, None) или (None, текст ошибки)
+async def fetch_rate(currency):
+    if currency not in ["USD", "EUR"]:
+        return Decimal(1), None
+    try:
+        async with http_session.get(RATE_SERVER_URL, params={"currency": currency}) as response:
+            if response.status != 200:
+                return None, "Ошибка получения курса валют."
+            rate_data = await response.json(content_type=None)
+        return Decimal(str(rate_data.get("rate", 1.0))), None
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, AttributeError, InvalidOperation):
+        return None, "Не удалось подключиться к серверу курса валют."
+
+# Итоги по типам операций: одна строка сводной таблицы balances по ключу,
+# ее поддерживают триггеры на operations (см. create_db_rgz.py)
+async def fetch_totals(chat_id):
+    row = await db_fetchone("SELECT income, expense FROM balances WHERE chat_id = %s", (chat_id,))
+    if row is None:
+        return {}
+    return {"ДОХОД": row[0], "РАСХОД": row[1]}
+
+# Страница операций, от новых к старым, с keyset-пагинацией по (date, id):
+# direction "next" — строки старше key, "prev" — строки новее key.
+# Возвращает (строки, есть_предыдущая, есть_следующая)
+async def fetch_operations_page(chat_id, direction=None, key=None):
+    if direction == "next":
+        rows = await db_fetchall(
+            "SELECT id, date, sum, type_operation FROM operations "
+            "WHERE chat_id = %s AND (date, id) < (%s, %s) "
+            "ORDER BY date DESC, id DESC LIMIT %s",
+            (chat_id, key[0], key[1], PAGE_SIZE + 1)
+        )
+        return rows[:PAGE_SIZE], True, len(rows) > PAGE_SIZE
+    if direction == "prev":
+        rows = await db_fetchall(
+            "SELECT id, date, sum, type_operation FROM operations "
+            "WHERE chat_id = %s AND (date, id) > (%s, %s) "
+            "ORDER BY date ASC, id ASC LIMIT %s",
+            (chat_id, key[0], key[1], PAGE_SIZE + 1)
+        )
+        return rows[:PAGE_SIZE][::-1], len(rows) > PAGE_SIZE, True
+    rows = await db_fetchall(
+        "SELECT id, date, sum, type_operation FROM operations "
+        "WHERE chat_id = %s ORDER BY date DESC, id DESC LIMIT %s",
+        (chat_id, PAGE_SIZE + 1)
+    )
+    return rows[:PAGE_SIZE], False, len(rows) > PAGE_SIZE
+
+def page_keyboard(currency, rows, has_prev, has_next):
+    buttons = []
+    if has_prev:
+        first_id, first_date = rows[0][0], rows[0][1]
+        buttons.append(InlineKeyboardButton(
+            text="« Новее", callback_data=f"ops:{currency}:prev:{first_date.isoformat()}:{first_id}"
+        ))
+    if has_next:
+        last_id, last_date = rows[-1][0], rows[-1][1]
+        buttons.append(InlineKeyboardButton(
+            text="Старее »", callback_data=f"ops:{currency}:next:{last_date.isoformat()}:{last_id}"
+        ))
+    return InlineKeyboardMarkup(inline_keyboard=[buttons]) if buttons else None
+
+async def show_operations(callback, currency, direction=None, key=None):
+    rate, error = await fetch_rate(currency)
+    if error:
+        await callback.message.answer(error)
+        await callback.answer()
+        return
+
+    chat_id = callback.message.chat.id
+    rows, has_prev, has_next = await fetch_operations_page(chat_id, direction, key)
+
+    if not rows:
         await callback.message.answer("У вас пока нет ни одной операции.")
         await callback.answer()
         return
 
-    total_income = 0.0
-    total_expense = 0.0
-    text = f"<b>Операции в {currency}:</b>\n\n"
+    totals = await fetch_totals(chat_id)
+    parts = render_operations(currency, rate, rows, totals)
+    keyboard = page_keyboard(currency, rows, has_prev, has_next)
+    await send_report(callback.message, parts, keyboard, edit=direction is not None)
+    await callback.answer()
 
-    for date, amount, op_type in records:
-        converted = round(float(amount) / rate, 2)
-        text += f"{date} | {converted} {currency} | {op_type}\n"
-        if op_type == "ДОХОД":
-            total_income += float(amount)
-        elif op_type == "РАСХОД":
-            total_expense += float(amount)
+# Отчет по операциям как последовательность HTML-фрагментов, по одному на строку;
+# send_report режет их на сообщения только по границам строк
+def render_operations(currency, rate, rows, totals):
+    total_income = totals.get("ДОХОД", Decimal(0))
+    total_expense = totals.get("РАСХОД", Decimal(0))
+
+    yield f"<b>Операции в {currency}:</b>\n\n"
+    for op_id, date, amount, op_type in rows:
+        converted = (amount / rate).quantize(CENT)
+        yield f"{date} | {converted} {currency} | {html.escape(op_type)}\n"
+
+    income_converted = (total_income / rate).quantize(CENT)
+    expense_converted = (total_expense / rate).quantize(CENT)
+    balance_converted = ((total_income - total_expense) / rate).quantize(CENT)
+    yield (
+        f"\n<b>Сводка:</b>\n"
+        f"Доходы: {income_converted} {currency}\n"
+        f"Расходы: {expense_converted} {currency}\n"
+        f"<b>Баланс: {balance_converted} {currency}</b>"
+    )
 
-    income_converted = round(total_income / rate, 2)
-    expense_converted = round(total_expense / rate, 2)
-    balance_converted = round((total_income - total_expense) / rate, 2)
+# Отправляет отчет сообщениями не длиннее лимита Telegram, клавиатура —
+# у последнего. При edit=True единственное сообщение заменяет текущее,
+# а если отчет не поместился в одно, части отправляются новыми сообщениями.
+async def send_report(message, parts, keyboard=None, edit=False):
+    pending = None
+    sent_any = False
+    for chunk in split_messages(parts):
+        if pending is not None:
+            await message.answer(pending, parse_mode="HTML")
+            sent_any = True
+        pending = chunk
+    if pending is None:
+        return
+    if edit and not sent_any:
+        await message.edit_text(pending, parse_mode="HTML", reply_markup=keyboard)
+    else:
+        await message.answer(pending, parse_mode="HTML", reply_markup=keyboard)
 
-    text += f"\n<b>Сводка:</b>\n"
-    text += f"Доходы: {income_converted} {currency}\n"
-    text += f"Расходы: {expense_converted} {currency}\n"
-    text += f"<b>Баланс: {balance_converted} {currency}</b>"
+@dp.callback_query(F.data.in_(CURRENCIES))
+async def handle_currency(callback: types.CallbackQuery):
+    await show_operations(callback, callback.data)
 
-    await callback.message.answer(text, parse_mode="HTML")
-    await callback.answer()
+# Переход по страницам: ops:<валюта>:<next|prev>:<дата>:<id>
+@dp.callback_query(F.data.startswith("ops:"))
+async def handle_operations_page(callback: types.CallbackQuery):
+    try:
+        _, currency, direction, key_date, key_id = callback.data.split(":")
+        key = (Date.fromisoformat(key_date), int(key_id))
+    except ValueError:
+        await callback.answer()
+        return
+    if currency not in CURRENCIES or direction not in ["next", "prev"]:
+        await callback.answer()
+        return
+    await show_operations(callback, currency, direction, key)
 
 # Запуск бота
 async def main():
-    await dp.start_polling(bot)
+    global pool, operation_writer, http_session
+    # Без настройки логирования сводка замеров (логгер "timing") не выводится
+    logging.basicConfig(level=logging.INFO)
+    bot = Bot(token=os.getenv("BOT_TOKEN"))
+    install_timing(dp, bot, timings)
+    summary_task = asyncio.create_task(timings.report_periodically())
+    pool = create_pool()
+    await pool.open()
+    http_session = create_http_session()
+    if WRITE_BEHIND:
+        operation_writer = WriteBehindBuffer(
+            insert_operations, max_rows=WRITE_BEHIND_MAX_ROWS, max_delay=WRITE_BEHIND_MAX_DELAY_MS / 1000
+        )
+        operation_writer.start()
+        timings.add_report("operation_writer", operation_writer.stats)
+    try:
+        await warm_user_cache()
+        await dp.start_polling(bot)
+    finally:
+        summary_task.cancel()
+        if operation_writer is not None:
+            await operation_writer.close()
+        await http_session.close()
+        await pool.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,176 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from functools import lru_cache
+
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from psycopg import AsyncCursor, AsyncServerCursor
+
+# Замеры времени для ботов на aiogram: обработчики, вызовы Bot API и запросы
+# к базе. Все, что дольше SLOW_LOG_THRESHOLD_MS, пишется в логгер "slow" одной
+# JSON-строкой; раз в TIMING_SUMMARY_INTERVAL секунд в логгер "timing"
+# выводится топ-N по суммарному времени.
+#
+# Категории замеров:
+#   update  — обновление целиком (фильтры, FSM-хранилище и обработчик)
+#   handler — сам обработчик, по имени функции
+#   api     — исходящий вызов Bot API, по имени метода
+#   sql     — cursor.execute, по отпечатку запроса
+
+SLOW_LOG_THRESHOLD_MS = float(os.getenv("SLOW_LOG_THRESHOLD_MS", "200"))
+TIMING_SUMMARY_INTERVAL = float(os.getenv("TIMING_SUMMARY_INTERVAL", "300"))
+TIMING_SUMMARY_TOP = int(os.getenv("TIMING_SUMMARY_TOP", "10"))
+
+slow_log = logging.getLogger("slow")
+summary_log = logging.getLogger("timing")
+
+
+# Отпечаток запроса: литералы заменены на ?, пробелы схлопнуты, списки IN (...) свернуты
+@lru_cache(maxsize=1024)
+def fingerprint(query):
+    text = query.decode() if isinstance(query, bytes) else str(query)
+    text = re.sub(r"'(?:[^']|'')*'", "?", text)
+    text = re.sub(r"%\(\w+\)s|%s|\$\d+", "?", text)
+    text = re.sub(r"\b\d+(?:\.\d+)?\b", "?", text)
+    text = re.sub(r"\(\s*\?(?:\s*,\s*\?)*\s*\)", "(?)", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class Timings:
+    def __init__(self, threshold_ms=SLOW_LOG_THRESHOLD_MS, clock=time.perf_counter):
+        self.threshold = threshold_ms / 1000
+        self.clock = clock
+        self.stats = {}  # (категория, имя) -> [число, сумма, максимум]
+        self.reports = {}  # имя -> функция, возвращающая словарь для периодической сводки
+
+    def record(self, kind, name, elapsed, **fields):
+        key = (kind, name)
+        entry = self.stats.get(key)
+        if entry is None:
+            entry = self.stats[key] = [0, 0.0, 0.0]
+        entry[0] += 1
+        entry[1] += elapsed
+        if elapsed > entry[2]:
+            entry[2] = elapsed
+        if elapsed >= self.threshold:
+            record = {"kind": kind, "name": name, "ms": round(elapsed * 1000, 3)}
+            record.update(fields)
+            slow_log.warning(json.dumps(record, ensure_ascii=False, default=str))
+
+    # Дополнительный источник для периодической сводки (например, метрики буфера записи)
+    def add_report(self, name, func):
+        self.reports[name] = func
+
+    # Топ-N по суммарному времени; reset=True начинает новый интервал
+    def top(self, n=TIMING_SUMMARY_TOP, kind=None, reset=False):
+        items = [(key, entry) for key, entry in self.stats.items() if kind is None or key[0] == kind]
+        items.sort(key=lambda item: item[1][1], reverse=True)
+        result = [
+            {
+                "kind": key[0], "name": key[1], "count": count,
+                "total_ms": round(total * 1000, 3),
+                "avg_ms": round(total * 1000 / count, 3),
+                "max_ms": round(peak * 1000, 3),
+            }
+            for key, (count, total, peak) in items[:n]
+        ]
+        if reset:
+            self.stats = {}
+        return result
+
+    async def report_periodically(self, interval=TIMING_SUMMARY_INTERVAL, n=TIMING_SUMMARY_TOP):
+        while True:
+            await asyncio.sleep(interval)
+            for row in self.top(n, reset=True):
+                summary_log.info(json.dumps(row, ensure_ascii=False))
+            for name, func in self.reports.items():
+                summary_log.info(json.dumps({"kind": "stats", "name": name, **func()}, ensure_ascii=False))
+
+
+# Обновление целиком (внешний middleware на dp.update)
+class UpdateTimingMiddleware(BaseMiddleware):
+    def __init__(self, timings):
+        self.timings = timings
+
+    async def __call__(self, handler, event, data):
+        start = self.timings.clock()
+        try:
+            return await handler(event, data)
+        finally:
+            self.timings.record("update", event.event_type, self.timings.clock() - start,
+                                update_id=event.update_id)
+
+
+# Обработчик сообщений или callback-запросов (внутренний middleware)
+class HandlerTimingMiddleware(BaseMiddleware):
+    def __init__(self, timings):
+        self.timings = timings
+
+    async def __call__(self, handler, event, data):
+        start = self.timings.clock()
+        try:
+            return await handler(event, data)
+        finally:
+            callback = data["handler"].callback
+            chat = getattr(event, "chat", None) or getattr(getattr(event, "message", None), "chat", None)
+            self.timings.record("handler", getattr(callback, "__name__", repr(callback)),
+                                self.timings.clock() - start,
+                                chat_id=chat.id if chat else None)
+
+
+# Исходящие вызовы Bot API (middleware сессии бота)
+class ApiTimingMiddleware(BaseRequestMiddleware):
+    def __init__(self, timings):
+        self.timings = timings
+
+    async def __call__(self, make_request, bot, method):
+        start = self.timings.clock()
+        try:
+            return await make_request(bot, method)
+        finally:
+            self.timings.record("api", type(method).__name__, self.timings.clock() - start)
+
+
+# Класс курсора psycopg 3, измеряющий каждый execute
+def timed_cursor_factory(timings, base=AsyncCursor):
+    class TimedCursor(base):
+        async def execute(self, query, params=None, **kwargs):
+            start = timings.clock()
+            try:
+                return await super().execute(query, params, **kwargs)
+            finally:
+                timings.record("sql", fingerprint(query), timings.clock() - start)
+
+        async def executemany(self, query, params_seq, **kwargs):
+            start = timings.clock()
+            try:
+                return await super().executemany(query, params_seq, **kwargs)
+            finally:
+                timings.record("sql", fingerprint(query), timings.clock() - start)
+
+    return TimedCursor
+
+
+# Функция для параметра configure у AsyncConnectionPool: замеры для обычных
+# и именованных (серверных) курсоров
+def pool_configure(timings):
+    cursor_factory = timed_cursor_factory(timings)
+    server_cursor_factory = timed_cursor_factory(timings, AsyncServerCursor)
+
+    async def configure(conn):
+        conn.cursor_factory = cursor_factory
+        conn.server_cursor_factory = server_cursor_factory
+
+    return configure
+
+
+# Подключает замеры к диспетчеру и боту
+def install_timing(dp, bot, timings):
+    dp.update.outer_middleware(UpdateTimingMiddleware(timings))
+    dp.message.middleware(HandlerTimingMiddleware(timings))
+    dp.callback_query.middleware(HandlerTimingMiddleware(timings))
+    bot.session.middleware(ApiTimingMiddleware(timings))
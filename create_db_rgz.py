@@ -1,3 +1,4 @@
+import argparse
 import psycopg2
 
 DB_CONFIG = {
@@ -50,5 +51,220 @@ def create_tables():
     conn.close()
     print("Все таблицы успешно созданы.")
 
+# Сводные таблицы по операциям поддерживаются триггерами:
+#   balances        — доходы, расходы и число операций по пользователю
+#   monthly_totals  — суммы по пользователю, месяцу, категории и типу
+#                     (category_id = 0 — операции без категории)
+# Триггеры уровня оператора с таблицами переходов: вставка тысяч строк
+# одним INSERT или COPY дает одно обновление на пользователя, а не на строку.
+
+# SQL, прибавляющий к сводкам дельту из подзапроса с колонками
+# (chat_id, date, category_id, type_operation, sum, n); у удаленных строк sum и n
+# отрицательные. Пользователи, удаляемые каскадом, пропускаются.
+def summary_delta_sql(delta):
+    return f"""
+        INSERT INTO balances AS b (chat_id, income, expense, operations_count)
+        SELECT d.chat_id,
+               SUM(CASE WHEN d.type_operation = 'ДОХОД' THEN d.sum ELSE 0 END),
+               SUM(CASE WHEN d.type_operation = 'РАСХОД' THEN d.sum ELSE 0 END),
+               SUM(d.n)
+        FROM ({delta}) d
+        WHERE EXISTS (SELECT 1 FROM users u WHERE u.chat_id = d.chat_id)
+        GROUP BY d.chat_id
+        ORDER BY d.chat_id
+        ON CONFLICT (chat_id) DO UPDATE SET
+            income = b.income + EXCLUDED.income,
+            expense = b.expense + EXCLUDED.expense,
+            operations_count = b.operations_count + EXCLUDED.operations_count;
+
+        INSERT INTO monthly_totals AS m (chat_id, month, category_id, type_operation, total, operations_count)
+        SELECT d.chat_id, date_trunc('month', d.date)::date, COALESCE(d.category_id, 0), d.type_operation,
+               SUM(d.sum), SUM(d.n)
+        FROM ({delta}) d
+        WHERE EXISTS (SELECT 1 FROM users u WHERE u.chat_id = d.chat_id)
+        GROUP BY 1, 2, 3, 4
+        ORDER BY 1, 2, 3, 4
+        ON CONFLICT (chat_id, month, category_id, type_operation) DO UPDATE SET
+            total = m.total + EXCLUDED.total,
+            operations_count = m.operations_count + EXCLUDED.operations_count;
+    """
+
+NEW_ROWS_DELTA = "SELECT chat_id, date, category_id, type_operation, sum, 1 AS n FROM new_rows"
+OLD_ROWS_DELTA = "SELECT chat_id, date, category_id, type_operation, -sum AS sum, -1 AS n FROM old_rows"
+
+def summary_trigger_function(name, delta):
+    return f"""
+        CREATE OR REPLACE FUNCTION {name}() RETURNS trigger AS $$
+        BEGIN
+            {summary_delta_sql(delta)}
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """
+
+# Пересчет сводок с нуля по таблице operations. Запись в operations на время
+# пересчета блокируется, чтение — нет.
+REBUILD_SUMMARIES = [
+    "LOCK TABLE operations IN SHARE ROW EXCLUSIVE MODE",
+    "DELETE FROM balances",
+    "DELETE FROM monthly_totals",
+    summary_delta_sql("SELECT chat_id, date, category_id, type_operation, sum, 1 AS n FROM operations"),
+]
+
+# Версионированные миграции схемы: (версия, описание, список SQL).
+# Новые миграции добавляются в конец списка с очередным номером версии.
+MIGRATIONS = [
+    (1, "Индексы для выборок операций и категорий по пользователю", [
+        # WHERE chat_id = ... ORDER BY date, id и keyset-пагинация по (date, id)
+        "CREATE INDEX IF NOT EXISTS operations_chat_date_id_idx ON operations (chat_id, date, id)",
+        # Раньше категории могли дублироваться: операции переводятся на
+        # категорию с наименьшим id, лишние строки удаляются, иначе
+        # уникальный индекс ниже не создастся
+        """
+        UPDATE operations o SET category_id = d.keep_id
+        FROM (SELECT id, MIN(id) OVER (PARTITION BY chat_id, name) AS keep_id FROM categories) d
+        WHERE o.category_id = d.id AND d.id <> d.keep_id
+        """,
+        """
+        DELETE FROM categories c USING categories k
+        WHERE k.chat_id = c.chat_id AND k.name = c.name AND k.id < c.id
+        """,
+        # WHERE name = ... AND chat_id = ...; заодно запрещает дубли категорий
+        "CREATE UNIQUE INDEX IF NOT EXISTS categories_chat_name_idx ON categories (chat_id, name)",
+        # ON DELETE SET NULL при удалении категории
+        "CREATE INDEX IF NOT EXISTS operations_category_id_idx ON operations (category_id)",
+    ]),
+    (2, "Сводные таблицы balances и monthly_totals с триггерами", [
+        """
+        CREATE TABLE IF NOT EXISTS balances (
+            chat_id BIGINT PRIMARY KEY REFERENCES users(chat_id) ON DELETE CASCADE,
+            income NUMERIC NOT NULL DEFAULT 0,
+            expense NUMERIC NOT NULL DEFAULT 0,
+            operations_count BIGINT NOT NULL DEFAULT 0
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS monthly_totals (
+            chat_id BIGINT NOT NULL REFERENCES users(chat_id) ON DELETE CASCADE,
+            month DATE NOT NULL,
+            category_id INTEGER NOT NULL,
+            type_operation TEXT NOT NULL,
+            total NUMERIC NOT NULL DEFAULT 0,
+            operations_count BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (chat_id, month, category_id, type_operation)
+        )
+        """,
+        summary_trigger_function("operations_summaries_insert", NEW_ROWS_DELTA),
+        summary_trigger_function("operations_summaries_delete", OLD_ROWS_DELTA),
+        summary_trigger_function("operations_summaries_update", f"{OLD_ROWS_DELTA} UNION ALL {NEW_ROWS_DELTA}"),
+        """
+        CREATE OR REPLACE FUNCTION operations_summaries_truncate() RETURNS trigger AS $$
+        BEGIN
+            DELETE FROM balances;
+            DELETE FROM monthly_totals;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        "DROP TRIGGER IF EXISTS operations_summaries_insert ON operations",
+        """
+        CREATE TRIGGER operations_summaries_insert
+        AFTER INSERT ON operations REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION operations_summaries_insert()
+        """,
+        "DROP TRIGGER IF EXISTS operations_summaries_delete ON operations",
+        """
+        CREATE TRIGGER operations_summaries_delete
+        AFTER DELETE ON operations REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION operations_summaries_delete()
+        """,
+        "DROP TRIGGER IF EXISTS operations_summaries_update ON operations",
+        """
+        CREATE TRIGGER operations_summaries_update
+        AFTER UPDATE ON operations REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION operations_summaries_update()
+        """,
+        "DROP TRIGGER IF EXISTS operations_summaries_truncate ON operations",
+        """
+        CREATE TRIGGER operations_summaries_truncate
+        AFTER TRUNCATE ON operations
+        FOR EACH STATEMENT EXECUTE FUNCTION operations_summaries_truncate()
+        """,
+        # Заполнение по уже накопленной истории
+        *REBUILD_SUMMARIES,
+    ]),
+]
+
+# Ключ advisory-блокировки, чтобы два процесса не мигрировали одновременно
+MIGRATION_LOCK_KEY = 4242001
+
+def migrate():
+    conn = psycopg2.connect(**DB_CONFIG)
+    cur = conn.cursor()
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT now()
+        );
+    """)
+    conn.commit()
+
+    cur.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_KEY,))
+    try:
+        cur.execute("SELECT version FROM schema_migrations")
+        applied = {row[0] for row in cur.fetchall()}
+
+        # Каждая миграция применяется в своей транзакции вместе с записью о ней
+        for version, description, statements in MIGRATIONS:
+            if version in applied:
+                continue
+            for statement in statements:
+                cur.execute(statement)
+            cur.execute(
+                "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                (version, description)
+            )
+            conn.commit()
+            print(f"Применена миграция {version}: {description}")
+    except psycopg2.Error:
+        conn.rollback()
+        raise
+    finally:
+        cur.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_KEY,))
+        conn.commit()
+        cur.close()
+        conn.close()
+
+    print("Схема базы данных актуальна.")
+
+# Пересчет сводных таблиц (например, после ручной правки данных
+# в обход триггеров или восстановления из резервной копии)
+def rebuild_summaries():
+    conn = psycopg2.connect(**DB_CONFIG)
+    cur = conn.cursor()
+    try:
+        for statement in REBUILD_SUMMARIES:
+            cur.execute(statement)
+        conn.commit()
+    except psycopg2.Error:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+    print("Сводные таблицы пересчитаны.")
+
 if __name__ == "__main__":
-    create_tables()
+    parser = argparse.ArgumentParser(description="Создание и обновление схемы finance_db")
+    parser.add_argument(
+        "command", nargs="?", default="init", choices=["init", "rebuild-summaries"],
+        help="init — создать таблицы и применить миграции, rebuild-summaries — пересчитать сводные таблицы"
+    )
+    args = parser.parse_args()
+    if args.command == "rebuild-summaries":
+        rebuild_summaries()
+    else:
+        create_tables()
+        migrate()
@@ -1,6 +1,12 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
 from flask import Flask, request, jsonify
 import psycopg2
 from psycopg2.extras import RealDictCursor
+from psycopg2.pool import ThreadedConnectionPool
+from flask_metrics import Metrics, install_metrics
 
 # Подключение к PostgreSQL
 DB_CONFIG = {
@@ -10,10 +16,53 @@ DB_CONFIG = {
     'host': '127.0.0.1'
 }
 
+# Размер пула соединений
+DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', '1'))
+DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', '10'))
+
+metrics = Metrics()
+
+_pool = None
+_pool_lock = threading.Lock()
+# Ограничивает число одновременно выданных соединений: при исчерпании пула
+# запрос ждет свободное соединение, а не получает PoolError
+_pool_slots = threading.BoundedSemaphore(DB_POOL_MAX)
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadedConnectionPool(
+                    DB_POOL_MIN, DB_POOL_MAX, **DB_CONFIG,
+                    cursor_factory=metrics.cursor_factory(RealDictCursor)
+                )
+    return _pool
+
+@contextmanager
 def get_conn():
-    return psycopg2.connect(**DB_CONFIG, cursor_factory=RealDictCursor)
+    pool = get_pool()
+    start = time.perf_counter()
+    with _pool_slots:
+        conn = pool.getconn()
+        metrics.observe("db_connection_acquire_seconds", time.perf_counter() - start)
+        try:
+            yield conn
+            conn.commit()
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            # Соединение разорвано: закрываем его, пул откроет новое
+            pool.putconn(conn, close=True)
+            conn = None
+            raise
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            if conn is not None:
+                pool.putconn(conn)
 
 app = Flask(__name__)
+install_metrics(app, metrics)
 
 # POST /load
 @app.route('/load', methods=['POST'])
@@ -22,16 +71,16 @@ def load():
     name = data.get('name')
     rate = data.get('rate')
 
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM currencies WHERE currency_name = %s", (name,))
-    if cur.fetchone():
-        conn.close()
-        return jsonify({'error': 'Currency already exists'}), 400
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "INSERT INTO currencies (currency_name, rate) VALUES (%s, %s) "
+            "ON CONFLICT (currency_name) DO NOTHING",
+            (name, rate)
+        )
+        if cur.rowcount == 0:
+            return jsonify({'error': 'Currency already exists'}), 400
 
-    cur.execute("INSERT INTO currencies (currency_name, rate) VALUES (%s, %s)", (name, rate))
-    conn.commit()
-    conn.close()
     return jsonify({'message': 'Currency added'}), 200
 
 # POST /update_currency
@@ -41,16 +90,12 @@ def update_currency():
     name = data.get('name')
     rate = data.get('rate')
 
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM currencies WHERE currency_name = %s", (name,))
-    if not cur.fetchone():
-        conn.close()
-        return jsonify({'error': 'Currency not found'}), 404
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("UPDATE currencies SET rate = %s WHERE currency_name = %s", (rate, name))
+        if cur.rowcount == 0:
+            return jsonify({'error': 'Currency not found'}), 404
 
-    cur.execute("UPDATE currencies SET rate = %s WHERE currency_name = %s", (rate, name))
-    conn.commit()
-    conn.close()
     return jsonify({'message': 'Currency updated'}), 200
 
 # POST /delete
@@ -59,17 +104,13 @@ def delete():
     data = request.get_json()
     name = data.get('name')
 
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM currencies WHERE currency_name = %s", (name,))
-    if not cur.fetchone():
-        conn.close()
-        return jsonify({'error': 'Currency not found'}), 404
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM currencies WHERE currency_name = %s", (name,))
+        if cur.rowcount == 0:
+            return jsonify({'error': 'Currency not found'}), 404
 
-    cur.execute("DELETE FROM currencies WHERE currency_name = %s", (name,))
-    conn.commit()
-    conn.close()
     return jsonify({'message': 'Currency deleted'}), 200
 
 if __name__ == '__main__':
-    app.run(port=5001)
\ No newline at end of file
+    app.run(port=5001)
@@ -1,6 +1,12 @@
+import os
+import json
+import threading
+import time
+from decimal import Decimal, InvalidOperation
 from flask import Flask, request, jsonify
 import psycopg2
 from psycopg2.extras import RealDictCursor
+from flask_metrics import Metrics, install_metrics
 
 # Подключение к PostgreSQL
 DB_CONFIG = {
@@ -10,39 +16,194 @@ DB_CONFIG = {
     'host': '127.0.0.1'
 }
 
+# Как часто сверять версию курсов с базой (секунды)
+RATE_CACHE_TTL = float(os.getenv('RATE_CACHE_TTL', '5'))
+# Сколько можно отдавать курсы из кэша, если база недоступна (секунды)
+RATE_CACHE_MAX_STALENESS = float(os.getenv('RATE_CACHE_MAX_STALENESS', '60'))
+# Сколько ждать подключения к базе (секунды): обновление кэша не должно
+# зависать на недоступном сервере дольше этого
+DB_CONNECT_TIMEOUT = int(os.getenv('DB_CONNECT_TIMEOUT', '5'))
+# Максимальное число позиций в одном запросе /convert_batch
+MAX_BATCH_ITEMS = int(os.getenv('MAX_BATCH_ITEMS', '100000'))
+
+metrics = Metrics()
+_timed_cursor = (None, None)  # (базовый класс, класс курсора с замерами)
+
+# Класс курсора с замерами строится при первом подключении и пересобирается,
+# только если RealDictCursor модуля подменили (так делает loadtest.py)
+def timed_cursor_class():
+    global _timed_cursor
+    base, cursor_class = _timed_cursor
+    if base is not RealDictCursor:
+        cursor_class = metrics.cursor_factory(RealDictCursor)
+        _timed_cursor = (RealDictCursor, cursor_class)
+    return cursor_class
+
 def get_conn():
-    return psycopg2.connect(**DB_CONFIG, cursor_factory=RealDictCursor)
+    with metrics.timer("db_connection_acquire_seconds"):
+        return psycopg2.connect(**DB_CONFIG, connect_timeout=DB_CONNECT_TIMEOUT,
+                                cursor_factory=timed_cursor_class())
+
+# Кэш курсов валют в памяти процесса.
+# Таблица загружается целиком и заменяется одной ссылкой, поэтому читатели
+# не берут блокировок. Раз в RATE_CACHE_TTL секунд один из запросов сверяет
+# счетчик currencies_version (см. init_db.py) и перечитывает курсы только
+# если они изменились. Курсы, не подтвержденные дольше max_staleness, не
+# отдаются никому — в том числе пока обновление идет в другом потоке.
+class StaleRatesError(RuntimeError):
+    pass
+
+class RateCache:
+    def __init__(self, ttl, max_staleness):
+        self.ttl = ttl
+        self.max_staleness = max_staleness
+        self.table = None  # ({currency_name: row}, [row, ...])
+        self.version = None
+        self.checked_at = 0.0
+        self.loaded_at = 0.0
+        self._refresh_lock = threading.Lock()
+
+    def refresh(self, force=False):
+        conn = get_conn()
+        try:
+            cur = conn.cursor()
+            try:
+                cur.execute("SELECT version FROM currencies_version")
+                version = cur.fetchone()['version']
+            except psycopg2.errors.UndefinedTable:
+                # Таблицы версий нет (база создана без init_db.py):
+                # курсы перечитываются при каждой проверке раз в ttl
+                conn.rollback()
+                version = None
+            if force or self.table is None or version is None or version != self.version:
+                cur.execute("SELECT * FROM currencies ORDER BY id")
+                rows = [dict(row) for row in cur.fetchall()]
+                self.table = ({row['currency_name']: row for row in rows}, rows)
+                self.version = version
+        finally:
+            conn.close()
+        now = time.monotonic()
+        self.checked_at = now
+        self.loaded_at = now
+
+    def get(self):
+        if self.table is None:
+            with self._refresh_lock:
+                if self.table is None:
+                    self.refresh(force=True)
+        elif time.monotonic() - self.checked_at >= self.ttl and self._refresh_lock.acquire(blocking=False):
+            try:
+                self.refresh()
+            except psycopg2.Error:
+                # База недоступна: отдаем старые курсы, но не дольше max_staleness
+                if time.monotonic() - self.loaded_at >= self.max_staleness:
+                    raise
+                self.checked_at = time.monotonic()
+            finally:
+                self._refresh_lock.release()
+        if time.monotonic() - self.loaded_at >= self.max_staleness:
+            raise StaleRatesError("Курсы валют устарели, база недоступна")
+        return self.table
+
+rate_cache = RateCache(RATE_CACHE_TTL, RATE_CACHE_MAX_STALENESS)
+
+# Сумма как точное Decimal-число: строки и целые приводятся без потерь,
+# дробные числа из JSON уже разобраны в Decimal (parse_float=Decimal)
+def parse_amount(value):
+    if isinstance(value, bool) or not isinstance(value, (int, str, Decimal)):
+        raise InvalidOperation
+    amount = Decimal(value)
+    if not amount.is_finite():
+        raise InvalidOperation
+    return amount
 
 app = Flask(__name__)
+install_metrics(app, metrics)
 
 # GET /convert
 @app.route('/convert', methods=['GET'])
 def convert():
     currency_name = request.args.get('currency')
-    amount = float(request.args.get('amount'))
+    try:
+        amount = parse_amount(request.args.get('amount'))
+    except InvalidOperation:
+        return jsonify({'error': 'Invalid amount'}), 400
 
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM currencies WHERE currency_name = %s", (currency_name,))
-    currency = cur.fetchone()
-    conn.close()
+    rates, _ = rate_cache.get()
+    currency = rates.get(currency_name)
 
     if not currency:
         return jsonify({'error': 'Currency not found'}), 404
 
     converted_amount = amount * currency['rate']
-    return jsonify({'converted_amount': converted_amount}), 200
+    return jsonify({'converted_amount': str(converted_amount)}), 200
+
+# POST /convert_batch
+# Принимает список позиций [{"currency": ..., "amount": ...}, ...]
+# (или {"items": [...]}) либо колоночную форму
+# {"currencies": [...], "amounts": [...]}. Результаты возвращаются в том же
+# порядке и в той же форме; для неизвестной валюты или некорректной суммы
+# вместо результата возвращается ошибка позиции.
+@app.route('/convert_batch', methods=['POST'])
+def convert_batch():
+    try:
+        data = json.loads(request.get_data(cache=False), parse_float=Decimal)
+    except ValueError:
+        return jsonify({'error': 'Invalid JSON'}), 400
+
+    columnar = isinstance(data, dict) and 'currencies' in data
+    if columnar:
+        currencies = data.get('currencies')
+        amounts = data.get('amounts')
+        if not isinstance(currencies, list) or not isinstance(amounts, list) or len(currencies) != len(amounts):
+            return jsonify({'error': 'currencies and amounts must be lists of equal length'}), 400
+    else:
+        items = data.get('items') if isinstance(data, dict) else data
+        if not isinstance(items, list):
+            return jsonify({'error': 'Expected a list of items'}), 400
+        try:
+            currencies = [item['currency'] for item in items]
+            amounts = [item['amount'] for item in items]
+        except (TypeError, KeyError):
+            return jsonify({'error': 'Each item must have currency and amount'}), 400
+
+    if len(currencies) > MAX_BATCH_ITEMS:
+        return jsonify({'error': f'Too many items, maximum is {MAX_BATCH_ITEMS}'}), 413
+
+    # Один снимок кэша на весь запрос: курсы не меняются посреди пакета
+    rates, _ = rate_cache.get()
+    converted = []
+    errors = []
+    for currency_name, value in zip(currencies, amounts):
+        currency = rates.get(currency_name) if isinstance(currency_name, str) else None
+        if currency is None:
+            converted.append(None)
+            errors.append('Currency not found')
+            continue
+        try:
+            amount = parse_amount(value)
+        except (InvalidOperation, TypeError, ValueError):
+            converted.append(None)
+            errors.append('Invalid amount')
+            continue
+        converted.append(str(amount * currency['rate']))
+        errors.append(None)
+
+    if columnar:
+        return jsonify({'converted_amounts': converted, 'errors': errors}), 200
+    results = [
+        {'converted_amount': amount} if error is None else {'error': error}
+        for amount, error in zip(converted, errors)
+    ]
+    return jsonify({'results': results}), 200
 
 # GET /currencies
 @app.route('/currencies', methods=['GET'])
 def get_currencies():
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM currencies")
-    currencies = cur.fetchall()
-    conn.close()
+    _, currencies = rate_cache.get()
 
     return jsonify(currencies), 200
 
 if __name__ == '__main__':
-    app.run(port=5002)
\ No newline at end of file
+    rate_cache.refresh(force=True)
+    app.run(port=5002)
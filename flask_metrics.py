@@ -0,0 +1,236 @@
+import itertools
+import threading
+import time
+import weakref
+from bisect import bisect_left
+
+# Метрики для Flask-сервисов в текстовом формате Prometheus.
+#
+# Каждый поток пишет в свой шард (словари счетчиков и гистограмм), поэтому
+# запись метрики — это поиск в словаре и сложение без блокировок. Блокировка
+# берется только при появлении и завершении потока и при выдаче /metrics,
+# когда шарды суммируются. Шард завершившегося потока сразу сворачивается
+# в общий итог, поэтому число шардов не превышает числа живых потоков и
+# память не растет при сервере "поток на запрос".
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Shard:
+    __slots__ = ("values", "histograms")
+
+    def __init__(self):
+        self.values = {}      # (имя, метки) -> число (счетчики и gauge)
+        self.histograms = {}  # (имя, метки) -> [счетчики по корзинам..., сумма]
+
+
+# Живет только в threading.local своего потока: когда поток завершается и
+# его локальные данные освобождаются, срабатывает weakref.finalize
+class _ShardOwner:
+    __slots__ = ("__weakref__",)
+
+
+class Metrics:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._meta = {}  # имя -> (тип, описание)
+        self._local = threading.local()
+        # RLock: финализатор шарда может сработать в потоке, который уже держит блокировку
+        self._lock = threading.RLock()
+        self._shards = {}  # номер -> шард живого потока
+        self._shard_ids = itertools.count()
+        self._retired = _Shard()
+
+    def describe(self, name, kind, help_text):
+        self._meta[name] = (kind, help_text)
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = _Shard()
+            owner = _ShardOwner()
+            with self._lock:
+                shard_id = next(self._shard_ids)
+                self._shards[shard_id] = shard
+            weakref.finalize(owner, self._retire, shard_id)
+            self._local.owner = owner
+            self._local.shard = shard
+            return shard
+
+    # Поток завершился: его шард переходит в общий итог
+    def _retire(self, shard_id):
+        with self._lock:
+            shard = self._shards.pop(shard_id, None)
+            if shard is not None:
+                self._merge_into(self._retired, shard)
+
+    # labels — кортеж пар (имя, значение) в постоянном порядке
+    def inc(self, name, labels=(), value=1):
+        values = self._shard().values
+        key = (name, labels)
+        values[key] = values.get(key, 0) + value
+
+    # gauge хранится как сумма приращений по всем шардам
+    gauge_add = inc
+
+    def observe(self, name, value, labels=()):
+        histograms = self._shard().histograms
+        key = (name, labels)
+        series = histograms.get(key)
+        if series is None:
+            series = histograms[key] = [0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    # Контекстный менеджер для измерения длительности блока в секундах
+    def timer(self, name, labels=()):
+        return _Timer(self, name, labels)
+
+    def _merge_into(self, target, shard):
+        for key, value in list(shard.values.items()):
+            target.values[key] = target.values.get(key, 0) + value
+        for key, series in list(shard.histograms.items()):
+            total = target.histograms.get(key)
+            if total is None:
+                total = target.histograms[key] = [0] * len(series)
+            for i, value in enumerate(series):
+                total[i] += value
+
+    def collect(self):
+        result = _Shard()
+        with self._lock:
+            self._merge_into(result, self._retired)
+            for shard in list(self._shards.values()):
+                self._merge_into(result, shard)
+        return result
+
+    def render(self):
+        data = self.collect()
+        families = {}
+        for (name, labels), value in data.values.items():
+            families.setdefault(name, []).append(("", labels, value))
+        for (name, labels), series in data.histograms.items():
+            lines = families.setdefault(name, [])
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                lines.append(("_bucket", labels + (("le", _format_bound(bound)),), cumulative))
+            lines.append(("_sum", labels, series[-1]))
+            lines.append(("_count", labels, cumulative))
+
+        out = []
+        for name in sorted(families):
+            kind, help_text = self._meta.get(name, ("untyped", ""))
+            if help_text:
+                out.append(f"# HELP {name} {help_text}")
+            out.append(f"# TYPE {name} {kind}")
+            for suffix, labels, value in families[name]:
+                out.append(f"{name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(out) + "\n"
+
+    # Класс курсора psycopg2 на основе base, измеряющий время каждого запроса
+    def cursor_factory(self, base):
+        metrics = self
+
+        class TimedCursor(base):
+            def execute(self, query, vars=None):
+                start = time.perf_counter()
+                try:
+                    return super().execute(query, vars)
+                finally:
+                    metrics.observe("db_query_duration_seconds", time.perf_counter() - start,
+                                    (("statement", _statement_kind(query)),))
+
+            def executemany(self, query, vars_list):
+                start = time.perf_counter()
+                try:
+                    return super().executemany(query, vars_list)
+                finally:
+                    metrics.observe("db_query_duration_seconds", time.perf_counter() - start,
+                                    (("statement", _statement_kind(query)),))
+
+        return TimedCursor
+
+
+class _Timer:
+    __slots__ = ("metrics", "name", "labels", "start")
+
+    def __init__(self, metrics, name, labels):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.start, self.labels)
+
+
+def _statement_kind(query):
+    text = query.decode() if isinstance(query, bytes) else str(query)
+    word = text.lstrip().split(None, 1)
+    return word[0].upper() if word else ""
+
+
+def _format_bound(bound):
+    return "+Inf" if bound == float("inf") else repr(float(bound))
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+# Подключает метрики к приложению Flask: время запроса по маршруту,
+# число запросов в обработке, счетчики кодов ответа и маршрут /metrics
+def install_metrics(app, metrics=None):
+    from flask import Response, g, request
+
+    metrics = metrics or Metrics()
+    metrics.describe("http_request_duration_seconds", "histogram", "Время обработки запроса по маршруту")
+    metrics.describe("http_requests_in_flight", "gauge", "Запросы в обработке")
+    metrics.describe("http_responses_total", "counter", "Ответы по маршруту и коду")
+    metrics.describe("db_connection_acquire_seconds", "histogram", "Время получения соединения с базой")
+    metrics.describe("db_query_duration_seconds", "histogram", "Время выполнения запроса к базе")
+
+    @app.before_request
+    def _metrics_start():
+        g._metrics_start = time.perf_counter()
+        metrics.gauge_add("http_requests_in_flight", ())
+
+    @app.after_request
+    def _metrics_status(response):
+        g._metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _metrics_finish(exc):
+        start = g.pop("_metrics_start", None)
+        if start is None:
+            return
+        metrics.gauge_add("http_requests_in_flight", (), -1)
+        rule = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+        labels = (("route", rule), ("method", request.method))
+        metrics.observe("http_request_duration_seconds", time.perf_counter() - start, labels)
+        status = g.pop("_metrics_status", 500)
+        metrics.inc("http_responses_total", labels + (("status", str(status)),))
+
+    def metrics_view():
+        return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+    app.add_url_rule("/metrics", "metrics", metrics_view)
+    return metrics
@@ -7,6 +7,9 @@ DB_CONFIG = {
     'host': '127.0.0.1'
 }
 
+# Параметры подключения к самой базе lab6db
+LAB6DB_CONFIG = {**DB_CONFIG, 'dbname': 'lab6db'}
+
 def create_database():
     conn = psycopg2.connect(**DB_CONFIG)
     conn.autocommit = True
@@ -20,13 +23,8 @@ def create_database():
     
     conn.close()
 
-def create_table():
-    conn = psycopg2.connect(
-        user='postgres',
-        password='postgres',
-        dbname='lab6db',
-        host='127.0.0.1'
-    )
+def create_table(config=LAB6DB_CONFIG):
+    conn = psycopg2.connect(**config)
     cur = conn.cursor()
     
     try:
@@ -44,6 +42,45 @@ def create_table():
     
     conn.close()
 
+# Счетчик версий таблицы currencies: увеличивается триггером при любом
+# изменении и позволяет кэшам сервисов дешево проверять актуальность курсов
+def create_version_table(config=LAB6DB_CONFIG):
+    conn = psycopg2.connect(**config)
+    cur = conn.cursor()
+    
+    try:
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS currencies_version (
+                id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+                version BIGINT NOT NULL
+            )
+        """)
+        cur.execute("""
+            INSERT INTO currencies_version (id, version) VALUES (TRUE, 0)
+            ON CONFLICT (id) DO NOTHING
+        """)
+        cur.execute("""
+            CREATE OR REPLACE FUNCTION bump_currencies_version() RETURNS trigger AS $$
+            BEGIN
+                UPDATE currencies_version SET version = version + 1;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        """)
+        cur.execute("DROP TRIGGER IF EXISTS currencies_version_bump ON currencies")
+        cur.execute("""
+            CREATE TRIGGER currencies_version_bump
+            AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON currencies
+            FOR EACH STATEMENT EXECUTE FUNCTION bump_currencies_version()
+        """)
+        conn.commit()
+        print("Таблица currencies_version успешно создана")
+    except psycopg2.Error as e:
+        print(f"Ошибка при создании таблицы версий: {e}")
+    
+    conn.close()
+
 if __name__ == '__main__':
     create_database()
-    create_table()
\ No newline at end of file
+    create_table()
+    create_version_table()
\ No newline at end of file
@@ -9,8 +9,7 @@ import os
 # Получение токена бота из переменных окружения
 API_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
 
-# Инициализация бота и диспетчера
-bot = Bot(token=API_TOKEN )
+# Инициализация диспетчера; бот создается в main()
 dp = Dispatcher()
 
 # Словарь для хранения курсов валют {валюта: курс}
@@ -128,6 +127,7 @@ async def process_convert_amount(message: Message, state: FSMContext):
 
 # Запуск бота
 async def main():
+    bot = Bot(token=API_TOKEN)
     await dp.start_polling(bot)
 
 if __name__ == "__main__":
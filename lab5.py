@@ -1,4 +1,5 @@
 import os
+import argparse
 from aiogram import Bot, Dispatcher, types
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.filters.command import Command
@@ -6,21 +7,28 @@ from aiogram.fsm.context import FSMContext
 from aiogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardRemove
 from decimal import Decimal, InvalidOperation
 import asyncio
+import logging
 import psycopg2
 from psycopg2 import sql
+from psycopg_pool import AsyncConnectionPool
+from membership_cache import MembershipCache
+from init_db import create_version_table
+from bot_timing import Timings, install_timing, pool_configure
 
 # Раздел I. Создание базы данных
 
+DB_CONFIG = {
+    "dbname": "lab6db",
+    "user": "postgres",
+    "password": "postgres",
+    "host": "localhost",
+    "port": "5432"
+}
+
 # Подключение к базе данных
 def create_connection():
     try:
-        conn = psycopg2.connect(
-            dbname="lab6db",
-            user="postgres",
-            password="postgres",
-            host="localhost",
-            port="5432"
-        )
+        conn = psycopg2.connect(**DB_CONFIG)
         return conn
     except Exception as e:
         print(f"Ошибка подключения к базе данных: {e}")
@@ -53,23 +61,47 @@ def create_tables():
             
             conn.commit()
             print("Таблицы успешно созданы")
+        # Счетчик версий currencies, по которому data-maneger.py проверяет кэш курсов
+        create_version_table(DB_CONFIG)
     except Exception as e:
         print(f"Ошибка при создании таблиц: {e}")
     finally:
         if conn:
             conn.close()
 
-create_tables()
-
 # Раздел II. Разработка бота
 
 # Получение токена бота из переменных окружения
 API_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
 
-# Инициализация бота и диспетчера
-bot = Bot(token=API_TOKEN)
+# Инициализация диспетчера; бот создается в main(), а таблицы —
+# отдельной командой "python lab5.py init", поэтому импорт модуля
+# не обращается ни к базе, ни к Telegram
 dp = Dispatcher()
 
+# Пул соединений для обработчиков: создается в main(), соединения берутся
+# на время запроса через "async with pool.connection() as conn" и
+# возвращаются в пул при выходе из блока
+DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', '1'))
+DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', '10'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))
+
+# Замеры обработчиков, вызовов Bot API и SQL (см. bot_timing.py)
+timings = Timings()
+
+pool = None
+
+def create_pool():
+    return AsyncConnectionPool(
+        kwargs=DB_CONFIG,
+        min_size=DB_POOL_MIN,
+        max_size=DB_POOL_MAX,
+        timeout=DB_POOL_TIMEOUT,
+        check=AsyncConnectionPool.check_connection,
+        configure=pool_configure(timings),
+        open=False
+    )
+
 # Состояния для FSM
 class CurrencyStates(StatesGroup):
     name = State()
@@ -80,22 +112,43 @@ class CurrencyStates(StatesGroup):
     edit_currency = State()
     edit_rate = State()
 
+# Кэш администраторов. Таблица admins меняется вручную в базе, поэтому
+# и положительные, и отрицательные ответы живут ограниченное время:
+# добавление или удаление админа видно не позже чем через ADMIN_CACHE_TTL секунд
+ADMIN_CACHE_TTL = float(os.getenv('ADMIN_CACHE_TTL', '60'))
+admin_cache = MembershipCache(
+    max_size=int(os.getenv('ADMIN_CACHE_SIZE', '10000')),
+    negative_ttl=ADMIN_CACHE_TTL,
+    positive_ttl=ADMIN_CACHE_TTL
+)
+
+# Загрузка списка администраторов в кэш при старте
+async def warm_admin_cache():
+    try:
+        async with pool.connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute("SELECT chat_id FROM admins")
+                admin_cache.load(row[0] for row in await cursor.fetchall())
+    except Exception as e:
+        print(f"Ошибка при загрузке администраторов: {e}")
+
 # Проверка администратора
 async def is_admin(chat_id: str) -> bool:
-    conn = create_connection()
-    if conn is None:
-        return False
+    chat_id = str(chat_id)
+    cached = admin_cache.get(chat_id)
+    if cached is not None:
+        return cached
     
     try:
-        with conn.cursor() as cursor:
-            cursor.execute("SELECT id FROM admins WHERE chat_id = %s", (str(chat_id),))
-            return cursor.fetchone() is not None
+        async with pool.connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute("SELECT id FROM admins WHERE chat_id = %s", (chat_id,))
+                found = await cursor.fetchone() is not None
+                admin_cache.set(chat_id, found)
+                return found
     except Exception as e:
         print(f"Ошибка при проверке администратора: {e}")
         return False
-    finally:
-        if conn:
-            conn.close()
 
 # Обработчик команды /start
 @dp.message(Command("start"))
@@ -159,28 +212,25 @@ async def process_add_currency_name(message: Message, state: FSMContext):
         return
     
     # Проверка на существование валюты
-    conn = create_connection()
-    if conn is None:
-        await state.clear()
-        return
-    
     try:
-        with conn.cursor() as cursor:
-            cursor.execute("SELECT id FROM currencies WHERE currency_name = %s", (currency_name,))
-            if cursor.fetchone() is not None:
-                await message.answer("Данная валюта уже существует")
-                await state.clear()
-                return
-            
-            await state.update_data(currency_name=currency_name)
-            await message.answer(f"Введите курс {currency_name} к рублю (например, 75.5):")
-            await state.set_state(CurrencyStates.rate)
+        async with pool.connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute("SELECT id FROM currencies WHERE currency_name = %s", (currency_name,))
+                exists = await cursor.fetchone() is not None
     except Exception as e:
         await message.answer(f"Ошибка: {e}")
         await state.clear()
-    finally:
-        if conn:
-            conn.close()
+        return
+
+    # Ответ отправляется после возврата соединения в пул
+    if exists:
+        await message.answer("Данная валюта уже существует")
+        await state.clear()
+        return
+    
+    await state.update_data(currency_name=currency_name)
+    await message.answer(f"Введите курс {currency_name} к рублю (например, 75.5):")
+    await state.set_state(CurrencyStates.rate)
 
 # Обработчик добавления валюты - курс
 @dp.message(CurrencyStates.rate)
@@ -196,78 +246,63 @@ async def process_add_currency_rate(message: Message, state: FSMContext):
     data = await state.get_data()
     currency_name = data['currency_name']
     
-    conn = create_connection()
-    if conn is None:
-        await state.clear()
-        return
-    
+    await state.clear()
     try:
-        with conn.cursor() as cursor:
-            cursor.execute(
-                "INSERT INTO currencies (currency_name, rate) VALUES (%s, %s)",
-                (currency_name, rate)
-            )
-            conn.commit()
-            await message.answer(f"Валюта {currency_name} успешно добавлена с курсом {rate} RUB")
+        async with pool.connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(
+                    "INSERT INTO currencies (currency_name, rate) VALUES (%s, %s)",
+                    (currency_name, rate)
+                )
+                await conn.commit()
     except Exception as e:
         await message.answer(f"Ошибка при добавлении валюты: {e}")
-    finally:
-        if conn:
-            conn.close()
-        await state.clear()
+        return
+    await message.answer(f"Валюта {currency_name} успешно добавлена с курсом {rate} RUB")
 
 # Обработчик удаления валюты
 @dp.message(CurrencyStates.delete_currency)
 async def process_delete_currency(message: Message, state: FSMContext):
     currency_name = message.text.strip().upper()
     
-    conn = create_connection()
-    if conn is None:
-        await state.clear()
-        return
-    
+    await state.clear()
     try:
-        with conn.cursor() as cursor:
-            cursor.execute("DELETE FROM currencies WHERE currency_name = %s", (currency_name,))
-            if cursor.rowcount == 0:
-                await message.answer(f"Валюта {currency_name} не найдена")
-            else:
-                conn.commit()
-                await message.answer(f"Валюта {currency_name} успешно удалена")
+        async with pool.connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute("DELETE FROM currencies WHERE currency_name = %s", (currency_name,))
+                deleted = cursor.rowcount
+                await conn.commit()
     except Exception as e:
         await message.answer(f"Ошибка при удалении валюты: {e}")
-    finally:
-        if conn:
-            conn.close()
-        await state.clear()
+        return
+    if deleted == 0:
+        await message.answer(f"Валюта {currency_name} не найдена")
+    else:
+        await message.answer(f"Валюта {currency_name} успешно удалена")
 
 # Обработчик изменения курса - выбор валюты
 @dp.message(CurrencyStates.edit_currency)
 async def process_edit_currency(message: Message, state: FSMContext):
     currency_name = message.text.strip().upper()
     
-    conn = create_connection()
-    if conn is None:
-        await state.clear()
-        return
-    
     try:
-        with conn.cursor() as cursor:
-            cursor.execute("SELECT id FROM currencies WHERE currency_name = %s", (currency_name,))
-            if cursor.fetchone() is None:
-                await message.answer(f"Валюта {currency_name} не найдена")
-                await state.clear()
-                return
-            
-            await state.update_data(edit_currency=currency_name)
-            await message.answer(f"Введите новый курс для {currency_name}:")
-            await state.set_state(CurrencyStates.edit_rate)
+        async with pool.connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute("SELECT id FROM currencies WHERE currency_name = %s", (currency_name,))
+                exists = await cursor.fetchone() is not None
     except Exception as e:
         await message.answer(f"Ошибка: {e}")
         await state.clear()
-    finally:
-        if conn:
-            conn.close()
+        return
+
+    if not exists:
+        await message.answer(f"Валюта {currency_name} не найдена")
+        await state.clear()
+        return
+    
+    await state.update_data(edit_currency=currency_name)
+    await message.answer(f"Введите новый курс для {currency_name}:")
+    await state.set_state(CurrencyStates.edit_rate)
 
 # Обработчик изменения курса - новый курс
 @dp.message(CurrencyStates.edit_rate)
@@ -283,112 +318,88 @@ async def process_edit_rate(message: Message, state: FSMContext):
     data = await state.get_data()
     currency_name = data['edit_currency']
     
-    conn = create_connection()
-    if conn is None:
-        await state.clear()
-        return
-    
+    await state.clear()
     try:
-        with conn.cursor() as cursor:
-            cursor.execute(
-                "UPDATE currencies SET rate = %s WHERE currency_name = %s",
-                (new_rate, currency_name)
-            )
-            conn.commit()
-            await message.answer(f"Курс {currency_name} успешно изменен на {new_rate} RUB")
+        async with pool.connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(
+                    "UPDATE currencies SET rate = %s WHERE currency_name = %s",
+                    (new_rate, currency_name)
+                )
+                await conn.commit()
     except Exception as e:
         await message.answer(f"Ошибка при изменении курса: {e}")
-    finally:
-        if conn:
-            conn.close()
-        await state.clear()
+        return
+    await message.answer(f"Курс {currency_name} успешно изменен на {new_rate} RUB")
 
 # Обработчик команды /get_currencies
 @dp.message(Command("get_currencies"))
 async def cmd_get_currencies(message: Message):
-    conn = create_connection()
-    if conn is None:
-        await message.answer("Ошибка подключения к базе данных")
-        return
-    
     try:
-        with conn.cursor() as cursor:
-            cursor.execute("SELECT currency_name, rate FROM currencies ORDER BY currency_name")
-            currencies = cursor.fetchall()
-            
-            if not currencies:
-                await message.answer("В базе данных нет сохраненных валют")
-                return
-            
-            response = "Текущие курсы валют:\n"
-            for currency in currencies:
-                response += f"{currency[0]}: {currency[1]} RUB\n"
-            
-            await message.answer(response)
+        async with pool.connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute("SELECT currency_name, rate FROM currencies ORDER BY currency_name")
+                currencies = await cursor.fetchall()
     except Exception as e:
         await message.answer(f"Ошибка при получении курсов валют: {e}")
-    finally:
-        if conn:
-            conn.close()
+        return
+    
+    if not currencies:
+        await message.answer("В базе данных нет сохраненных валют")
+        return
+    
+    response = "Текущие курсы валют:\n"
+    for currency in currencies:
+        response += f"{currency[0]}: {currency[1]} RUB\n"
+    
+    await message.answer(response)
 
 # Обработчик команды /convert - выбор валюты
 @dp.message(Command("convert"))
 async def cmd_convert(message: Message, state: FSMContext):
-    conn = create_connection()
-    if conn is None:
-        await message.answer("Ошибка подключения к базе данных")
-        return
-    
     try:
-        with conn.cursor() as cursor:
-            cursor.execute("SELECT currency_name FROM currencies")
-            currencies = cursor.fetchall()
-            
-            if not currencies:
-                await message.answer("В базе данных нет сохраненных валют")
-                return
-            
-            await message.answer(
-                "Введите название валюты для конвертации (доступные: " +
-                ", ".join([curr[0] for curr in currencies]) + "):"
-            )
-            await state.set_state(CurrencyStates.currency)
+        async with pool.connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute("SELECT currency_name FROM currencies")
+                currencies = await cursor.fetchall()
     except Exception as e:
         await message.answer(f"Ошибка: {e}")
-    finally:
-        if conn:
-            conn.close()
+        return
+    
+    if not currencies:
+        await message.answer("В базе данных нет сохраненных валют")
+        return
+    
+    await message.answer(
+        "Введите название валюты для конвертации (доступные: " +
+        ", ".join([curr[0] for curr in currencies]) + "):"
+    )
+    await state.set_state(CurrencyStates.currency)
 
 # Обработчик конвертации - выбор валюты
 @dp.message(CurrencyStates.currency)
 async def process_convert_currency(message: Message, state: FSMContext):
     currency_name = message.text.strip().upper()
     
-    conn = create_connection()
-    if conn is None:
-        await state.clear()
-        return
-    
     try:
-        with conn.cursor() as cursor:
-            cursor.execute("SELECT rate FROM currencies WHERE currency_name = %s", (currency_name,))
-            rate = cursor.fetchone()
-            
-            if rate is None:
-                await message.answer(
-                    "Такой валюты нет в списке. Введите название еще раз или используйте /get_currencies для просмотра доступных валют:"
-                )
-                return
-            
-            await state.update_data(convert_currency=currency_name, convert_rate=rate[0])
-            await message.answer(f"Введите сумму в {currency_name} для конвертации в рубли:")
-            await state.set_state(CurrencyStates.amount)
+        async with pool.connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute("SELECT rate FROM currencies WHERE currency_name = %s", (currency_name,))
+                rate = await cursor.fetchone()
     except Exception as e:
         await message.answer(f"Ошибка: {e}")
         await state.clear()
-    finally:
-        if conn:
-            conn.close()
+        return
+    
+    if rate is None:
+        await message.answer(
+            "Такой валюты нет в списке. Введите название еще раз или используйте /get_currencies для просмотра доступных валют:"
+        )
+        return
+    
+    await state.update_data(convert_currency=currency_name, convert_rate=rate[0])
+    await message.answer(f"Введите сумму в {currency_name} для конвертации в рубли:")
+    await state.set_state(CurrencyStates.amount)
 
 # Обработчик конвертации - ввод суммы
 @dp.message(CurrencyStates.amount)
@@ -419,7 +430,28 @@ async def process_convert_amount(message: Message, state: FSMContext):
 
 # Запуск бота
 async def main():
-    await dp.start_polling(bot)
+    global pool
+    logging.basicConfig(level=logging.INFO)
+    bot = Bot(token=API_TOKEN)
+    install_timing(dp, bot, timings)
+    summary_task = asyncio.create_task(timings.report_periodically())
+    pool = create_pool()
+    await pool.open()
+    try:
+        await warm_admin_cache()
+        await dp.start_polling(bot)
+    finally:
+        summary_task.cancel()
+        await pool.close()
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Бот для работы с курсами валют")
+    parser.add_argument(
+        "command", nargs="?", default="run", choices=["run", "init"],
+        help="run — запустить бота, init — создать таблицы в базе данных"
+    )
+    args = parser.parse_args()
+    if args.command == "init":
+        create_tables()
+    else:
+        asyncio.run(main())
\ No newline at end of file
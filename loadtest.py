@@ -0,0 +1,431 @@
+import argparse
+import collections
+import http.client
+import importlib.util
+import itertools
+import json
+import logging
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+import psycopg2
+from psycopg2 import sql
+from psycopg2.extras import RealDictCursor
+from werkzeug.serving import make_server
+
+import init_db
+
+# Нагрузочное тестирование Flask-сервисов валют.
+# Сервисы запускаются в этом же процессе на свободных портах, база — либо
+# временный кластер PostgreSQL (initdb/pg_ctl во временном каталоге), либо
+# временная база на уже запущенном сервере (--dsn). Генератор подает запросы
+# с заданной частотой (открытая модель: задержка считается от запланированного
+# момента отправки, поэтому очередь перед перегруженным сервисом тоже видна
+# в перцентилях) и пишет JSON-отчет, который можно сравнить с прошлым прогоном.
+#
+#   python loadtest.py --mix convert=70,currencies=10,update=15,load=3,delete=2 \
+#       --rps 300 --duration 30 --output report.json --compare previous.json
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+APPS = {
+    "currency_manager": "currency_manager.py",
+    "data_manager": "data-maneger.py",
+    "rate_server": "server_rgz.py",
+}
+DB_APPS = {"currency_manager", "data_manager"}
+
+DEFAULT_MIX = "convert=60,convert_batch=5,currencies=10,update=15,load=5,delete=5"
+
+
+# Сценарии запросов: каждый возвращает (метод, путь, тело JSON или None)
+class Workload:
+    def __init__(self, currencies, batch_size):
+        self.currencies = currencies
+        self.batch_size = batch_size
+        self.created = collections.deque()
+        self.seq = itertools.count()
+
+    def convert(self, rng):
+        params = {"currency": rng.choice(self.currencies), "amount": f"{rng.uniform(1, 1000):.2f}"}
+        return "GET", "/convert?" + urlencode(params), None
+
+    def convert_batch(self, rng):
+        items = [
+            {"currency": rng.choice(self.currencies), "amount": f"{rng.uniform(1, 1000):.2f}"}
+            for _ in range(self.batch_size)
+        ]
+        return "POST", "/convert_batch", items
+
+    def currencies_list(self, rng):
+        return "GET", "/currencies", None
+
+    def update(self, rng):
+        return "POST", "/update_currency", {"name": rng.choice(self.currencies), "rate": round(rng.uniform(1, 200), 2)}
+
+    def load(self, rng):
+        name = f"LT{next(self.seq)}"
+        self.created.append(name)
+        return "POST", "/load", {"name": name, "rate": round(rng.uniform(1, 200), 2)}
+
+    def delete(self, rng):
+        try:
+            name = self.created.popleft()
+        except IndexError:
+            name = "LT_MISSING"
+        return "POST", "/delete", {"name": name}
+
+    def rate(self, rng):
+        return "GET", "/rate?" + urlencode({"currency": rng.choice(["USD", "EUR"])}), None
+
+
+# операция -> (сервис, сценарий)
+OPERATIONS = {
+    "convert": ("data_manager", Workload.convert),
+    "convert_batch": ("data_manager", Workload.convert_batch),
+    "currencies": ("data_manager", Workload.currencies_list),
+    "update": ("currency_manager", Workload.update),
+    "load": ("currency_manager", Workload.load),
+    "delete": ("currency_manager", Workload.delete),
+    "rate": ("rate_server", Workload.rate),
+}
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        op, _, weight = part.partition("=")
+        op = op.strip()
+        if op not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"неизвестная операция {op!r}, доступны: {', '.join(OPERATIONS)}")
+        mix[op] = float(weight or 1)
+    return mix
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# Базы данных для прогона. start() возвращает параметры подключения
+# к пустой базе, stop() удаляет все, что было создано.
+class TempClusterBackend:
+    def __init__(self, pg_bin=None):
+        self.pg_bin = pg_bin
+        self.dir = None
+        self.data = None
+
+    def _tool(self, name):
+        path = os.path.join(self.pg_bin, name) if self.pg_bin else shutil.which(name)
+        if not path or not os.path.exists(path):
+            raise RuntimeError(f"{name} не найден: укажите каталог PostgreSQL через --pg-bin или сервер через --dsn")
+        return path
+
+    def start(self):
+        initdb, pg_ctl = self._tool("initdb"), self._tool("pg_ctl")
+        self.dir = tempfile.mkdtemp(prefix="loadtest_pg_")
+        self.data = os.path.join(self.dir, "data")
+        port = free_port()
+        subprocess.run(
+            [initdb, "-D", self.data, "-U", "postgres", "--auth=trust", "-E", "UTF8"],
+            check=True, stdout=subprocess.DEVNULL
+        )
+        subprocess.run(
+            [pg_ctl, "-D", self.data, "-w", "-l", os.path.join(self.dir, "postgres.log"),
+             "-o", f"-p {port} -k {self.dir} -c listen_addresses=127.0.0.1", "start"],
+            check=True, stdout=subprocess.DEVNULL
+        )
+        return {"user": "postgres", "host": "127.0.0.1", "port": port, "dbname": "postgres"}
+
+    def stop(self):
+        if self.data:
+            subprocess.run([self._tool("pg_ctl"), "-D", self.data, "-m", "immediate", "stop"],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if self.dir:
+            shutil.rmtree(self.dir, ignore_errors=True)
+
+
+class DsnBackend:
+    def __init__(self, dsn):
+        self.admin = psycopg2.extensions.parse_dsn(dsn)
+        self.dbname = f"loadtest_{os.getpid()}_{int(time.time())}"
+
+    def _admin_execute(self, query):
+        conn = psycopg2.connect(**self.admin)
+        conn.autocommit = True
+        try:
+            conn.cursor().execute(query)
+        finally:
+            conn.close()
+
+    def start(self):
+        self._admin_execute(sql.SQL("CREATE DATABASE {}").format(sql.Identifier(self.dbname)))
+        return {**self.admin, "dbname": self.dbname}
+
+    def stop(self):
+        self._admin_execute(sql.SQL("DROP DATABASE IF EXISTS {} WITH (FORCE)").format(sql.Identifier(self.dbname)))
+
+
+def prepare_database(params, currencies):
+    init_db.create_table(params)
+    init_db.create_version_table(params)
+    conn = psycopg2.connect(**params)
+    try:
+        with conn.cursor() as cur:
+            cur.executemany(
+                "INSERT INTO currencies (currency_name, rate) VALUES (%s, %s)",
+                [(name, round(random.uniform(1, 200), 2)) for name in currencies]
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+# Счетчик обращений к базе по сервисам: каждый cursor.execute — один round
+# trip, executemany в psycopg2 — по одному на каждый набор параметров
+class RoundTripCounter:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = collections.Counter()
+
+    def add(self, app, n=1):
+        with self.lock:
+            self.counts[app] += n
+
+    def cursor_factory(self, app):
+        counter = self
+
+        class CountingCursor(RealDictCursor):
+            def execute(self, query, vars=None):
+                counter.add(app)
+                return super().execute(query, vars)
+
+            def executemany(self, query, vars_list):
+                vars_list = list(vars_list)
+                counter.add(app, len(vars_list))
+                return super().executemany(query, vars_list)
+
+        return CountingCursor
+
+
+def load_app(name, db_params, counter):
+    spec = importlib.util.spec_from_file_location(f"loadtest_{name}", os.path.join(ROOT, APPS[name]))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    if name in DB_APPS:
+        module.DB_CONFIG.clear()
+        module.DB_CONFIG.update(db_params)
+        module.RealDictCursor = counter.cursor_factory(name)
+    return module.app
+
+
+class AppServer:
+    def __init__(self, app):
+        self.server = make_server("127.0.0.1", 0, app, threaded=True)
+        self.port = self.server.server_port
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+
+
+def run_load(mix, ports, workload, rps, duration, concurrency, seed):
+    ops = list(mix)
+    weights = [mix[op] for op in ops]
+    local = threading.local()
+    results = []
+
+    def connection(port):
+        conns = local.__dict__.setdefault("conns", {})
+        if port not in conns:
+            conns[port] = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        return conns[port]
+
+    def do_request(op, scheduled_at):
+        if not hasattr(local, "rng"):
+            local.rng = random.Random(f"{seed}-{threading.get_ident()}")
+        app, scenario = OPERATIONS[op]
+        method, path, body = scenario(workload, local.rng)
+        port = ports[app]
+        conn = connection(port)
+        try:
+            payload = json.dumps(body) if body is not None else None
+            headers = {"Content-Type": "application/json"} if payload is not None else {}
+            conn.request(method, path, body=payload, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            local.conns.pop(port, None)
+            status = None
+        results.append((op, status, time.perf_counter() - scheduled_at))
+
+    rng = random.Random(seed)
+    total = int(rps * duration)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        start = time.perf_counter()
+        for i in range(total):
+            scheduled_at = start + i / rps
+            delay = scheduled_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(do_request, rng.choices(ops, weights)[0], scheduled_at)
+    elapsed = time.perf_counter() - start
+    return results, elapsed
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(p / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def build_report(args, mix, results, elapsed, round_trips):
+    per_op = {}
+    per_app_requests = collections.Counter()
+    by_op = collections.defaultdict(list)
+    for op, status, latency in results:
+        by_op[op].append((status, latency))
+        per_app_requests[OPERATIONS[op][0]] += 1
+
+    for op, samples in sorted(by_op.items()):
+        latencies = sorted(latency * 1000 for _, latency in samples)
+        statuses = collections.Counter("transport_error" if s is None else str(s) for s, _ in samples)
+        errors = sum(1 for status, _ in samples if status is None or status >= 500)
+        per_op[op] = {
+            "requests": len(samples),
+            "errors": errors,
+            "status_counts": dict(statuses),
+            "latency_ms": {
+                "p50": percentile(latencies, 50),
+                "p95": percentile(latencies, 95),
+                "p99": percentile(latencies, 99),
+                "max": latencies[-1],
+                "mean": sum(latencies) / len(latencies),
+            },
+        }
+
+    per_app = {}
+    for app, requests in per_app_requests.items():
+        entry = {"requests": requests}
+        if app in DB_APPS:
+            entry["db_round_trips"] = round_trips[app]
+            entry["db_round_trips_per_request"] = round_trips[app] / requests
+        per_app[app] = entry
+
+    return {
+        "config": {
+            "mix": mix, "target_rps": args.rps, "duration_s": args.duration,
+            "concurrency": args.concurrency, "currencies": args.currencies,
+            "batch_size": args.batch_size, "seed": args.seed,
+        },
+        "achieved_rps": len(results) / elapsed if elapsed else 0.0,
+        "requests": len(results),
+        "errors": sum(entry["errors"] for entry in per_op.values()),
+        "operations": per_op,
+        "apps": per_app,
+    }
+
+
+# Сервисы с базой, обслужившие запросы, но не сделавшие ни одного обращения
+# к базе: значит, счетчик не подключился к их курсорам (например, сервис
+# связал класс курсора до подмены в load_app) и число round trip неверно
+def uncounted_apps(report):
+    return sorted(
+        app for app, entry in report["apps"].items()
+        if app in DB_APPS and entry["requests"] and not entry["db_round_trips"]
+    )
+
+
+def compare_reports(old, new):
+    print(f"RPS: {old['achieved_rps']:.1f} -> {new['achieved_rps']:.1f}")
+    for op, entry in new["operations"].items():
+        previous = old.get("operations", {}).get(op)
+        if previous is None:
+            continue
+        parts = []
+        for p in ("p50", "p95", "p99"):
+            a, b = previous["latency_ms"][p], entry["latency_ms"][p]
+            change = (b - a) / a * 100 if a else 0.0
+            parts.append(f"{p} {a:.2f} -> {b:.2f} ms ({change:+.0f}%)")
+        print(f"{op:15s} " + ", ".join(parts))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Нагрузочный тест сервисов валют")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"смесь операций с весами (по умолчанию {DEFAULT_MIX})")
+    parser.add_argument("--rps", type=float, default=200, help="целевая частота запросов")
+    parser.add_argument("--duration", type=float, default=30, help="длительность прогона, секунды")
+    parser.add_argument("--concurrency", type=int, default=32, help="число одновременных клиентов")
+    parser.add_argument("--currencies", type=int, default=50, help="число валют в тестовой базе")
+    parser.add_argument("--batch-size", type=int, default=100, help="позиций в запросе convert_batch")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--dsn", help="сервер PostgreSQL для временной базы (иначе — временный кластер)")
+    parser.add_argument("--pg-bin", help="каталог с initdb и pg_ctl для временного кластера")
+    parser.add_argument("--output", help="файл JSON-отчета")
+    parser.add_argument("--compare", help="прошлый JSON-отчет для сравнения")
+    args = parser.parse_args(argv)
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    apps = {OPERATIONS[op][0] for op in args.mix}
+    currencies = [f"C{i:03d}" for i in range(args.currencies)]
+
+    backend = None
+    db_params = None
+    servers = {}
+    counter = RoundTripCounter()
+    try:
+        if apps & DB_APPS:
+            backend = DsnBackend(args.dsn) if args.dsn else TempClusterBackend(args.pg_bin)
+            try:
+                db_params = backend.start()
+            except RuntimeError as e:
+                backend = None
+                parser.error(str(e))
+            prepare_database(db_params, currencies)
+        for name in sorted(apps):
+            servers[name] = AppServer(load_app(name, db_params, counter))
+
+        workload = Workload(currencies, args.batch_size)
+        ports = {name: server.port for name, server in servers.items()}
+        results, elapsed = run_load(args.mix, ports, workload, args.rps, args.duration, args.concurrency, args.seed)
+    finally:
+        for server in servers.values():
+            server.stop()
+        if backend is not None:
+            backend.stop()
+
+    report = build_report(args, args.mix, results, elapsed, counter.counts)
+    uncounted = uncounted_apps(report)
+    if uncounted:
+        print(f"Обращения к базе не посчитаны для {', '.join(uncounted)}: "
+              "курсор сервиса не использует счетчик из load_app", file=sys.stderr)
+        return 1
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare_reports(json.load(f), report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
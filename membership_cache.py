@@ -0,0 +1,66 @@
+import time
+from collections import OrderedDict
+
+
+# Кэш принадлежности к множеству (зарегистрированные пользователи, админы).
+# Положительные ответы хранятся в LRU ограниченного размера и, при заданном
+# positive_ttl, устаревают; отрицательные ответы живут negative_ttl секунд,
+# чтобы новая запись в таблице стала видна без перезапуска бота.
+class MembershipCache:
+    def __init__(self, max_size=100000, negative_ttl=30.0, positive_ttl=None, clock=time.monotonic):
+        self.max_size = max_size
+        self.negative_ttl = negative_ttl
+        self.positive_ttl = positive_ttl
+        self.clock = clock
+        self._members = OrderedDict()  # ключ -> момент добавления
+        self._negative = OrderedDict()  # ключ -> момент истечения
+
+    def __len__(self):
+        return len(self._members)
+
+    # True/False, если ответ известен, и None, если нужно спросить базу
+    def get(self, key):
+        added_at = self._members.get(key)
+        if added_at is not None:
+            if self.positive_ttl is not None and self.clock() - added_at >= self.positive_ttl:
+                del self._members[key]
+                return None
+            self._members.move_to_end(key)
+            return True
+        expires_at = self._negative.get(key)
+        if expires_at is not None:
+            if self.clock() < expires_at:
+                return False
+            del self._negative[key]
+        return None
+
+    def add(self, key):
+        self._negative.pop(key, None)
+        self._members[key] = self.clock()
+        self._members.move_to_end(key)
+        if len(self._members) > self.max_size:
+            self._members.popitem(last=False)
+
+    def add_negative(self, key):
+        self._members.pop(key, None)
+        self._negative[key] = self.clock() + self.negative_ttl
+        self._negative.move_to_end(key)
+        if len(self._negative) > self.max_size:
+            self._negative.popitem(last=False)
+
+    def discard(self, key):
+        self._members.pop(key, None)
+        self._negative.pop(key, None)
+
+    # Полная замена содержимого (прогрев при старте или периодическая перезагрузка)
+    def load(self, keys):
+        self._members.clear()
+        self._negative.clear()
+        for key in keys:
+            self.add(key)
+
+    def set(self, key, is_member):
+        if is_member:
+            self.add(key)
+        else:
+            self.add_negative(key)
@@ -0,0 +1,108 @@
+import re
+
+# Разбиение длинного HTML-отчета на сообщения Telegram.
+#
+# Отчет подается как последовательность фрагментов (обычно — строк таблицы),
+# каждый из которых сам по себе содержит сбалансированные теги. Фрагменты
+# укладываются в сообщения целиком, пока помещаются в лимит; собранное
+# сообщение сразу отдается наружу, поэтому в памяти держится не больше одного
+# сообщения, а каждый фрагмент просматривается один раз. Фрагмент, который
+# не помещается даже в пустое сообщение, режется по тексту: открытые теги
+# закрываются в конце куска и открываются заново в начале следующего.
+#
+# Длина считается в единицах UTF-16 по исходному HTML — это не меньше,
+# чем длина текста после разбора тегов, по которой Telegram применяет лимит.
+
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+TOKEN_RE = re.compile(r"(<[^>]*>|&#?\w+;)")
+TAG_NAME_RE = re.compile(r"</?\s*([a-zA-Z][\w-]*)")
+ENTITY_RE = re.compile(r"&#?\w+;")
+
+
+def text_length(text):
+    return len(text.encode("utf-16-le")) // 2
+
+
+# wrap — пара (открывающие, закрывающие) теги вокруг каждого сообщения, например ("<pre>", "</pre>")
+def split_messages(parts, limit=TELEGRAM_MESSAGE_LIMIT, wrap=("", "")):
+    opening, closing = wrap
+    budget = limit - text_length(opening) - text_length(closing)
+    if budget <= 0:
+        raise ValueError("Лимит сообщения меньше обрамляющих тегов")
+
+    chunk = []
+    size = 0
+    for part in parts:
+        length = text_length(part)
+        if size + length > budget and chunk:
+            yield opening + "".join(chunk) + closing
+            chunk = []
+            size = 0
+        if length > budget:
+            for piece in _cut_fragment(part, budget):
+                yield opening + piece + closing
+            continue
+        chunk.append(part)
+        size += length
+    if chunk:
+        yield opening + "".join(chunk) + closing
+
+
+# Режет один фрагмент по тексту, сохраняя баланс тегов в каждом куске
+def _cut_fragment(fragment, budget):
+    stack = []       # [(имя, открывающий тег)]
+    pieces = []
+    size = 0
+    closing_size = 0  # длина закрывающих тегов для текущего стека
+    has_text = False  # в текущем куске есть текст, а не только теги
+
+    def flush():
+        nonlocal pieces, size, has_text
+        text = "".join(pieces) + "".join(f"</{name}>" for name, _ in reversed(stack))
+        reopened = [tag for _, tag in stack]
+        pieces = reopened
+        size = sum(text_length(tag) for tag in reopened)
+        has_text = False
+        return text
+
+    for token in TOKEN_RE.split(fragment):
+        if not token:
+            continue
+        if token.startswith("<"):
+            match = TAG_NAME_RE.match(token)
+            name = match.group(1).lower() if match else ""
+            if token.startswith("</"):
+                if stack and stack[-1][0] == name:
+                    stack.pop()
+                    closing_size -= text_length(f"</{name}>")
+                pieces.append(token)
+                size += text_length(token)
+            elif not token.endswith("/>"):
+                extra = text_length(token) + text_length(f"</{name}>")
+                if size + closing_size + extra > budget and has_text:
+                    yield flush()
+                stack.append((name, token))
+                closing_size += text_length(f"</{name}>")
+                pieces.append(token)
+                size += text_length(token)
+            else:
+                pieces.append(token)
+                size += text_length(token)
+            continue
+
+        # Сущность (&amp; и т.п.) неделима, обычный текст режется посимвольно
+        units = [token] if ENTITY_RE.fullmatch(token) else token
+        for unit in units:
+            length = text_length(unit)
+            if size + closing_size + length > budget:
+                if not has_text:
+                    raise ValueError("Открытые теги не помещаются в лимит сообщения")
+                yield flush()
+                if size + closing_size + length > budget:
+                    raise ValueError("Открытые теги не помещаются в лимит сообщения")
+            pieces.append(unit)
+            size += length
+            has_text = True
+    if has_text:
+        yield flush()
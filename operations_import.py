@@ -0,0 +1,84 @@
+import csv
+from datetime import date as Date
+from decimal import Decimal, InvalidOperation
+
+# Разбор файла с операциями для импорта в finance_db.
+# Строка файла: дата (YYYY-MM-DD), сумма, тип (РАСХОД/ДОХОД), категория.
+# Разделитель — запятая, точка с запятой или табуляция (определяется по
+# первой строке); строка заголовка, если есть, пропускается. Файл читается
+# построчно, поэтому память не зависит от его размера.
+
+OPERATION_TYPES = {
+    "РАСХОД": "РАСХОД",
+    "ДОХОД": "ДОХОД",
+    "EXPENSE": "РАСХОД",
+    "INCOME": "ДОХОД",
+}
+HEADER_FIELDS = {"date", "дата"}
+SNIFF_SIZE = 4096
+
+
+class SemicolonDialect(csv.excel):
+    delimiter = ";"
+
+
+class RowError(ValueError):
+    pass
+
+
+# Разделитель по первой строке: табуляция и точка с запятой проверяются раньше
+# запятой, потому что запятая бывает в суммах и названиях категорий
+def detect_dialect(sample):
+    lines = sample.splitlines()
+    first_line = lines[0] if lines else ""
+    for delimiter in ("\t", ";"):
+        if first_line.count(delimiter) >= 3:
+            return csv.excel_tab if delimiter == "\t" else SemicolonDialect
+    return csv.excel
+
+
+def parse_amount(text):
+    text = text.strip().replace(" ", "")
+    if "," in text and "." not in text:
+        text = text.replace(",", ".")
+    try:
+        amount = Decimal(text)
+    except InvalidOperation:
+        raise RowError(f"некорректная сумма {text!r}")
+    if not amount.is_finite() or amount <= 0:
+        raise RowError(f"сумма должна быть положительной: {text!r}")
+    return amount
+
+
+# Возвращает (дата, сумма, тип, категория) или бросает RowError с причиной
+def parse_operation(fields):
+    if len(fields) < 4:
+        raise RowError("ожидается 4 поля: дата, сумма, тип, категория")
+    raw_date, raw_sum, raw_type, category = (field.strip() for field in fields[:4])
+    try:
+        op_date = Date.fromisoformat(raw_date)
+    except ValueError:
+        raise RowError(f"некорректная дата {raw_date!r}")
+    amount = parse_amount(raw_sum)
+    op_type = OPERATION_TYPES.get(raw_type.upper())
+    if op_type is None:
+        raise RowError(f"неизвестный тип операции {raw_type!r}")
+    if not category:
+        raise RowError("не указана категория")
+    return op_date, amount, op_type, category
+
+
+# Для каждой непустой строки файла выдает (номер строки, операция, ошибка):
+# операция — кортеж из parse_operation, ошибка — текст причины отказа
+def iter_operations(f):
+    dialect = detect_dialect(f.read(SNIFF_SIZE))
+    f.seek(0)
+    for line_no, fields in enumerate(csv.reader(f, dialect), start=1):
+        if not fields or not any(field.strip() for field in fields):
+            continue
+        if line_no == 1 and fields[0].strip().lower() in HEADER_FIELDS:
+            continue
+        try:
+            yield line_no, parse_operation(fields), None
+        except RowError as e:
+            yield line_no, None, str(e)
@@ -0,0 +1,385 @@
+import argparse
+import asyncio
+import collections
+import importlib.util
+import itertools
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+
+from aiogram import Bot, BaseMiddleware
+from aiogram.client.session.base import BaseSession
+from aiogram.dispatcher.event.bases import UNHANDLED
+from aiogram.types import Message, Update
+from psycopg.conninfo import conninfo_to_dict
+
+# Прогон ботов без Telegram: обновления (синтетические сценарии или записанные
+# getUpdates в JSONL) подаются прямо в dp.feed_update, а бот работает через
+# фиктивную сессию, которая только считает исходящие вызовы Bot API.
+# Тысячи чатов проходят многошаговые диалоги одновременно; в конце печатается
+# пропускная способность (updates/s) и задержки по обработчикам.
+#
+#   python replay_updates.py lab4 --chats 5000 --concurrency 500
+#   python replay_updates.py bot_rgz --chats 1000 --dsn "dbname=replay_db user=postgres"
+#   python replay_updates.py lab5 --updates recorded.jsonl --repeat 10 --dsn "dbname=replay_db user=postgres"
+#
+# Боты с базой (bot_rgz, lab5) прогоняются только на отдельной базе, заданной
+# через --dsn: она подменяет DB_CONFIG модуля, и в ней создается схема. Свою
+# рабочую базу бот в прогоне не трогает. Синтетические чаты bot_rgz не должны
+# пересекаться с уже зарегистрированными пользователями, иначе прогон не
+# начнется; после прогона удаляются только пользователи, добавленные им.
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+FAKE_TOKEN = "123456:REPLAY"
+
+
+# Фиктивная сессия Bot API: запросы не уходят в сеть
+class FakeSession(BaseSession):
+    def __init__(self):
+        super().__init__()
+        self.calls = collections.Counter()
+        self.message_ids = itertools.count(1)
+
+    async def make_request(self, bot, method, timeout=None):
+        self.calls[type(method).__name__] += 1
+        if getattr(method, "__returning__", None) is Message:
+            chat_id = getattr(method, "chat_id", 0)
+            return Message.model_validate(
+                {
+                    "message_id": next(self.message_ids),
+                    "date": int(time.time()),
+                    "chat": {"id": chat_id, "type": "private"},
+                    "text": getattr(method, "text", None),
+                },
+                context={"bot": bot},
+            )
+        return True
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        yield b""
+
+    async def close(self):
+        pass
+
+
+# Время каждого обработчика сообщений и callback-запросов
+class HandlerTimer(BaseMiddleware):
+    def __init__(self):
+        self.samples = collections.defaultdict(list)
+
+    async def __call__(self, handler, event, data):
+        start = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            callback = data["handler"].callback
+            self.samples[getattr(callback, "__name__", repr(callback))].append(time.perf_counter() - start)
+
+
+class UpdateFactory:
+    def __init__(self, bot):
+        self.bot = bot
+        self.ids = itertools.count(1)
+
+    def _user_chat(self, chat_id):
+        return {"id": chat_id, "is_bot": False, "first_name": f"user{chat_id}"}, {"id": chat_id, "type": "private"}
+
+    def message(self, chat_id, text):
+        update_id = next(self.ids)
+        user, chat = self._user_chat(chat_id)
+        return Update.model_validate(
+            {
+                "update_id": update_id,
+                "message": {
+                    "message_id": update_id, "date": int(time.time()),
+                    "chat": chat, "from": user, "text": text,
+                },
+            },
+            context={"bot": self.bot},
+        )
+
+    def callback(self, chat_id, data):
+        update_id = next(self.ids)
+        user, chat = self._user_chat(chat_id)
+        return Update.model_validate(
+            {
+                "update_id": update_id,
+                "callback_query": {
+                    "id": str(update_id), "from": user, "chat_instance": str(chat_id), "data": data,
+                    "message": {"message_id": update_id, "date": int(time.time()), "chat": chat, "text": "..."},
+                },
+            },
+            context={"bot": self.bot},
+        )
+
+
+# Сценарии: список шагов ("message", текст) или ("callback", data) для чата с номером i
+def lab4_script(i):
+    return [
+        ("message", "/start"),
+        ("message", "/save_currency"), ("message", "USD"), ("message", "75.5"),
+        ("message", "/convert"), ("message", "USD"), ("message", "100"),
+    ]
+
+
+def bot_script(i):
+    return [
+        ("message", "/start"),
+        ("message", "/get_currencies"),
+        ("message", "/convert"), ("message", "USD"), ("message", "100"),
+    ]
+
+
+def bot_rgz_script(i):
+    category = f"cat{i % 10}"
+    return [
+        ("message", "/start"),
+        ("message", "/reg"), ("message", f"user{i}"),
+        ("message", "/add_category"), ("message", category),
+        ("message", "/add_operation"), ("callback", "РАСХОД"), ("message", "100.50"),
+        ("message", "2024-01-15"), ("message", category),
+        ("message", "/operations"), ("callback", "RUB"),
+    ]
+
+
+def lab5_script(i):
+    return [
+        ("message", "/start"),
+        ("message", "/get_currencies"),
+        ("message", "/convert"), ("message", "USD"), ("message", "100"),
+    ]
+
+
+# Подготовка модуля к работе без main(): пулы соединений, HTTP-сессии, кэши
+async def setup_bot(module, args):
+    module.http_session = module.create_http_session()
+    return module.http_session.close
+
+
+# Цели, которым нужна база: для них обязателен --dsn
+DB_TARGETS = {"bot_rgz", "lab5"}
+
+
+async def open_pool(module):
+    module.pool = module.create_pool()
+    await module.pool.open(wait=True)
+
+
+# Схема finance_db в базе из --dsn
+def create_bot_rgz_schema(db_config):
+    import create_db_rgz
+    create_db_rgz.DB_CONFIG = db_config
+    create_db_rgz.create_tables()
+    create_db_rgz.migrate()
+
+
+def synthetic_chat_ids(args):
+    return list(range(args.first_chat_id, args.first_chat_id + args.chats))
+
+
+# Последний id в users до прогона: все строки с большим id добавлены прогоном.
+# Если среди синтетических чатов уже есть пользователи, прогон не начинается
+async def check_synthetic_range(module, args):
+    row = await module.db_fetchone(
+        "SELECT COUNT(*), (SELECT COALESCE(MAX(id), 0) FROM users) FROM users WHERE chat_id = ANY(%s)",
+        (synthetic_chat_ids(args),)
+    )
+    existing, last_id = row
+    if existing:
+        raise RuntimeError(
+            f"В базе уже есть {existing} пользователей с chat_id из диапазона "
+            f"{args.first_chat_id}..{args.first_chat_id + args.chats - 1}: задайте другой --first-chat-id"
+        )
+    return last_id
+
+
+# Пользователи, зарегистрированные прогоном; категории и операции удаляются каскадно
+async def delete_synthetic_users(module, args, last_id):
+    await module.db_execute(
+        "DELETE FROM users WHERE id > %s AND chat_id = ANY(%s)",
+        (last_id, synthetic_chat_ids(args))
+    )
+
+
+async def setup_bot_rgz(module, args):
+    await asyncio.to_thread(create_bot_rgz_schema, module.DB_CONFIG)
+    await open_pool(module)
+    last_id = None
+    try:
+        if not args.updates:
+            last_id = await check_synthetic_range(module, args)
+        await module.warm_user_cache()
+    except BaseException:
+        await module.pool.close()
+        raise
+    module.http_session = module.create_http_session()
+
+    async def teardown():
+        try:
+            if last_id is not None:
+                await delete_synthetic_users(module, args, last_id)
+        finally:
+            await module.http_session.close()
+            await module.pool.close()
+
+    return teardown
+
+
+async def setup_lab5(module, args):
+    await asyncio.to_thread(module.create_tables)
+    await open_pool(module)
+    await module.warm_admin_cache()
+    return module.pool.close
+
+
+# цель -> (файл модуля, сценарий, подготовка)
+TARGETS = {
+    "lab4": ("lab4/lab4.py", lab4_script, None),
+    "bot": ("bot.py", bot_script, setup_bot),
+    "bot_rgz": ("bot_rgz.py", bot_rgz_script, setup_bot_rgz),
+    "lab5": ("lab5.py", lab5_script, setup_lab5),
+}
+
+
+def load_module(target):
+    path = os.path.join(ROOT, TARGETS[target][0])
+    sys.path.insert(0, ROOT)
+    spec = importlib.util.spec_from_file_location(f"replay_{target}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def scripted_conversations(factory, script, chats, first_chat_id):
+    for i in range(chats):
+        chat_id = first_chat_id + i
+        yield [
+            factory.message(chat_id, payload) if kind == "message" else factory.callback(chat_id, payload)
+            for kind, payload in script(i)
+        ]
+
+
+# Записанные обновления: по чатам, порядок внутри чата сохраняется
+def recorded_conversations(bot, path, repeat):
+    by_chat = collections.defaultdict(list)
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                update = Update.model_validate(json.loads(line), context={"bot": bot})
+                event = update.event
+                chat = getattr(event, "chat", None) or getattr(getattr(event, "message", None), "chat", None)
+                by_chat[chat.id if chat else 0].append(update)
+    for _ in range(repeat):
+        yield from by_chat.values()
+
+
+def percentile(sorted_values, p):
+    index = min(len(sorted_values) - 1, max(0, int(round(p / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def latency_summary(samples):
+    values = sorted(s * 1000 for s in samples)
+    return {
+        "count": len(values),
+        "p50_ms": percentile(values, 50),
+        "p95_ms": percentile(values, 95),
+        "p99_ms": percentile(values, 99),
+        "max_ms": values[-1],
+        "mean_ms": sum(values) / len(values),
+    }
+
+
+async def replay(args):
+    module = load_module(args.target)
+    _, script, setup = TARGETS[args.target]
+    session = FakeSession()
+    bot = Bot(token=FAKE_TOKEN, session=session)
+    dp = module.dp
+
+    timer = HandlerTimer()
+    dp.message.middleware(timer)
+    dp.callback_query.middleware(timer)
+
+    if args.target in DB_TARGETS:
+        module.DB_CONFIG = {**module.DB_CONFIG, **conninfo_to_dict(args.dsn)}
+    teardown = await setup(module, args) if setup else None
+    factory = UpdateFactory(bot)
+    if args.updates:
+        conversations = list(recorded_conversations(bot, args.updates, args.repeat))
+    else:
+        conversations = list(scripted_conversations(factory, script, args.chats, args.first_chat_id))
+
+    update_latencies = []
+    unhandled = 0
+    failed = 0
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def run_conversation(updates):
+        nonlocal unhandled, failed
+        async with semaphore:
+            for update in updates:
+                start = time.perf_counter()
+                try:
+                    result = await dp.feed_update(bot, update)
+                except Exception:
+                    failed += 1
+                    continue
+                finally:
+                    update_latencies.append(time.perf_counter() - start)
+                if result is UNHANDLED:
+                    unhandled += 1
+
+    try:
+        start = time.perf_counter()
+        await asyncio.gather(*(run_conversation(updates) for updates in conversations))
+        elapsed = time.perf_counter() - start
+    finally:
+        if teardown:
+            await teardown()
+        await bot.session.close()
+
+    return {
+        "target": args.target,
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "conversations": len(conversations),
+        "updates": len(update_latencies),
+        "unhandled": unhandled,
+        "failed": failed,
+        "elapsed_s": elapsed,
+        "updates_per_s": len(update_latencies) / elapsed if elapsed else 0.0,
+        "update_latency": latency_summary(update_latencies) if update_latencies else None,
+        "handlers": {name: latency_summary(samples) for name, samples in sorted(timer.samples.items())},
+        "bot_api_calls": dict(session.calls),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Прогон обновлений через диспетчер бота без Telegram")
+    parser.add_argument("target", choices=list(TARGETS), help="какой бот прогонять")
+    parser.add_argument("--chats", type=int, default=1000, help="число чатов со сценарием")
+    parser.add_argument("--concurrency", type=int, default=200, help="одновременно активных чатов")
+    parser.add_argument("--first-chat-id", type=int, default=10_000_000, help="chat_id первого чата")
+    parser.add_argument("--updates", help="JSONL-файл с записанными обновлениями вместо сценария")
+    parser.add_argument("--repeat", type=int, default=1, help="сколько раз повторить записанные обновления")
+    parser.add_argument("--dsn", help="строка подключения к отдельной базе PostgreSQL для прогона (обязательна для bot_rgz и lab5)")
+    parser.add_argument("--output", help="сохранить отчет в JSON-файл")
+    args = parser.parse_args(argv)
+    if args.target in DB_TARGETS and not args.dsn:
+        parser.error(f"для {args.target} нужен --dsn с отдельной базой для прогона")
+
+    logging.basicConfig(level=logging.WARNING)
+    report = asyncio.run(replay(args))
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+import calendar
+import re
+from datetime import date as Date, timedelta
+
+# Разбор аргументов отчета "/operations <период> [группировка] [валюта]".
+# Период:
+#   month                      — текущий месяц по сегодняшний день
+#   Nd (например, 30d)         — последние N дней, включая сегодня
+#   YYYY-MM                    — календарный месяц
+#   YYYY                       — календарный год
+#   YYYY-MM-DD YYYY-MM-DD      — произвольный диапазон, границы включаются
+# Группировка: day, week, month, category (по умолчанию day).
+# Слово month, стоящее после уже заданного периода, означает группировку.
+
+GROUPINGS = ("day", "week", "month", "category")
+CURRENCIES = ("RUB", "EUR", "USD")
+MAX_DAYS = 100 * 366
+
+DAYS_RE = re.compile(r"(\d+)d")
+MONTH_RE = re.compile(r"(\d{4})-(\d{2})")
+YEAR_RE = re.compile(r"\d{4}")
+
+
+def month_bounds(year, month):
+    return Date(year, month, 1), Date(year, month, calendar.monthrange(year, month)[1])
+
+
+# Диапазон покрывает целые месяцы — тогда суммы можно брать из monthly_totals
+def covers_whole_months(date_from, date_to):
+    return date_from.day == 1 and (date_to + timedelta(days=1)).day == 1
+
+
+# Возвращает (валюта, дата начала, дата конца, группировка) или бросает ValueError
+def parse_report_args(args, today):
+    currency = "RUB"
+    grouping = None
+    period = None
+    dates = []
+
+    for token in args.split():
+        lower = token.lower()
+        if token.upper() in CURRENCIES:
+            currency = token.upper()
+        elif lower == "month" and period is None and not dates:
+            period = (today.replace(day=1), today)
+        elif lower in GROUPINGS:
+            if grouping is not None:
+                raise ValueError("Группировка указана дважды")
+            grouping = lower
+        elif DAYS_RE.fullmatch(lower):
+            days = int(DAYS_RE.fullmatch(lower).group(1))
+            if not 1 <= days <= MAX_DAYS:
+                raise ValueError("Некорректное число дней")
+            period = _set_period(period, (today - timedelta(days=days - 1), today))
+        elif MONTH_RE.fullmatch(token):
+            year, month = map(int, MONTH_RE.fullmatch(token).groups())
+            if not 1 <= month <= 12:
+                raise ValueError("Некорректный месяц")
+            period = _set_period(period, month_bounds(year, month))
+        elif YEAR_RE.fullmatch(token):
+            year = int(token)
+            period = _set_period(period, (Date(year, 1, 1), Date(year, 12, 31)))
+        else:
+            dates.append(Date.fromisoformat(token))
+
+    if dates:
+        if len(dates) != 2:
+            raise ValueError("Диапазон задается двумя датами")
+        period = _set_period(period, tuple(dates))
+    if period is None:
+        raise ValueError("Не указан период")
+    date_from, date_to = period
+    if date_from > date_to:
+        raise ValueError("Начало периода позже конца")
+    return currency, date_from, date_to, grouping or "day"
+
+
+def _set_period(current, new):
+    if current is not None:
+        raise ValueError("Период указан дважды")
+    return new
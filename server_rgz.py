@@ -1,6 +1,8 @@
 from flask import Flask, jsonify, request
+from flask_metrics import install_metrics
 
 app = Flask(__name__)
+install_metrics(app)
 
 # Статические курсы валют
 RATES = {
@@ -0,0 +1,67 @@
+import asyncio
+import json
+import logging
+
+import pytest
+
+pytest.importorskip("aiogram")
+pytest.importorskip("psycopg")
+
+from aiogram import Bot, Dispatcher
+from aiogram.filters.command import Command
+
+from bot_timing import Timings, fingerprint, install_timing
+from replay_updates import FakeSession, UpdateFactory
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_fingerprint():
+    assert fingerprint("SELECT id FROM t\n  WHERE name = %s AND chat_id = %s") == \
+        "SELECT id FROM t WHERE name = ? AND chat_id = ?"
+    assert fingerprint("SELECT * FROM t WHERE x IN (1, 2, 3) AND s = 'it''s'") == \
+        "SELECT * FROM t WHERE x IN (?) AND s = ?"
+
+def test_top_and_reset():
+    timings = Timings(threshold_ms=1000)
+    timings.record("sql", "a", 0.01)
+    timings.record("sql", "a", 0.03)
+    timings.record("handler", "b", 0.02)
+    top = timings.top(1)
+    assert top == [{"kind": "sql", "name": "a", "count": 2, "total_ms": 40.0, "avg_ms": 20.0, "max_ms": 30.0}]
+    assert [row["name"] for row in timings.top(kind="handler", reset=True)] == ["b"]
+    assert timings.top() == []
+
+def test_slow_log(caplog):
+    timings = Timings(threshold_ms=100)
+    with caplog.at_level(logging.WARNING, logger="slow"):
+        timings.record("sql", "fast", 0.05)
+        timings.record("sql", "slow", 0.25, chat_id=7)
+    assert len(caplog.records) == 1
+    assert json.loads(caplog.records[0].getMessage()) == {"kind": "sql", "name": "slow", "ms": 250.0, "chat_id": 7}
+
+def test_dispatcher_middlewares():
+    clock = FakeClock()
+    timings = Timings(clock=clock)
+    dp = Dispatcher()
+
+    @dp.message(Command("start"))
+    async def cmd_start(message):
+        clock.now += 0.5
+        await message.answer("ok")
+
+    async def run():
+        bot = Bot(token="123456:TEST", session=FakeSession())
+        install_timing(dp, bot, timings)
+        await dp.feed_update(bot, UpdateFactory(bot).message(1, "/start"))
+        await bot.session.close()
+
+    asyncio.run(run())
+    stats = {(row["kind"], row["name"]): row["count"] for row in timings.top(10)}
+    assert stats == {("update", "message"): 1, ("handler", "cmd_start"): 1, ("api", "SendMessage"): 1}
@@ -1,5 +1,5 @@
 import pytest
-from triangle_class import Triangle, IncorrectTriangleSides
+from triangle_class import Triangle, TriangleBatch, IncorrectTriangleSides
 
 def test_equilateral():
     t = Triangle(3, 3, 3)
@@ -12,4 +12,30 @@ def test_isosceles():
 
 def test_invalid_sides():
     with pytest.raises(IncorrectTriangleSides):
-        Triangle(1, 1, 3)
\ No newline at end of file
+        Triangle(1, 1, 3)
+
+def test_triangle_has_no_dict():
+    t = Triangle(3, 4, 5)
+    assert not hasattr(t, "__dict__")
+
+def test_batch_perimeters_and_types():
+    batch = TriangleBatch.from_triples([(3, 3, 3), (5, 5, 8), (6, 7, 8)], typecode="q")
+    assert len(batch) == 3
+    assert list(batch.perimeters()) == [9, 18, 21]
+    assert batch.types() == ["equilateral", "isosceles", "nonequilateral"]
+    assert batch.types() == [t.triangle_type() for t in batch]
+
+def test_batch_invalid_sides():
+    with pytest.raises(IncorrectTriangleSides):
+        TriangleBatch([3, 1], [3, 1], [3, 3])
+    batch = TriangleBatch([3, 0, -1], [3, 1, 2], [3, 1, 2], validate=False)
+    assert batch.invalid_rows() == [1, 2]
+
+def test_batch_filter_and_slice():
+    batch = TriangleBatch.from_triples([(3, 3, 3), (5, 5, 8), (6, 7, 8), (2, 2, 2)])
+    equilateral = batch.filter("equilateral")
+    assert isinstance(equilateral, TriangleBatch)
+    assert list(equilateral.perimeters()) == [9.0, 6.0]
+    tail = batch[1:3]
+    assert tail.types() == ["isosceles", "nonequilateral"]
+    assert batch[2].perimeter() == 21.0
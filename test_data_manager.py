@@ -0,0 +1,221 @@
+import importlib.util
+import os
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip("flask")
+psycopg2 = pytest.importorskip("psycopg2")
+
+# Файл сервиса называется data-maneger.py, поэтому импортируется по пути
+_spec = importlib.util.spec_from_file_location(
+    "data_maneger", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data-maneger.py")
+)
+dm = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(dm)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(dm.time, "monotonic", clock)
+    return clock
+
+
+# База с таблицами currencies и currencies_version; version=None — таблицы версий нет
+class FakeDb:
+    def __init__(self, rows, version=1):
+        self.rows = rows
+        self.version = version
+        self.queries = []
+
+    def connect(self):
+        return FakeConnection(self)
+
+
+class FakeConnection:
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self):
+        return FakeCursor(self.db)
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.result = None
+
+    def execute(self, query, vars=None):
+        self.db.queries.append(query)
+        if "currencies_version" in query:
+            if self.db.version is None:
+                raise psycopg2.errors.UndefinedTable("relation \"currencies_version\" does not exist")
+            self.result = [{"version": self.db.version}]
+        else:
+            self.result = [dict(row) for row in self.db.rows]
+
+    def fetchone(self):
+        return self.result[0]
+
+    def fetchall(self):
+        return self.result
+
+
+RATES = [
+    {"id": 1, "currency_name": "USD", "rate": Decimal("75.5")},
+    {"id": 2, "currency_name": "EUR", "rate": Decimal("90")},
+]
+
+
+def unreachable_db():
+    raise psycopg2.OperationalError("connection refused")
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeDb(RATES)
+    monkeypatch.setattr(dm, "get_conn", db.connect)
+    return db
+
+
+def test_cache_rechecks_version_after_ttl(clock, db):
+    cache = dm.RateCache(ttl=5, max_staleness=60)
+    table = cache.get()
+    assert table[0]["USD"]["rate"] == Decimal("75.5")
+    assert len(db.queries) == 2
+
+    clock.now += 4
+    assert cache.get() is table
+    assert len(db.queries) == 2
+
+    # Версия не изменилась: сверка без перечитывания курсов
+    clock.now += 2
+    assert cache.get() is table
+    assert len(db.queries) == 3
+
+    db.version = 2
+    db.rows = [{"id": 1, "currency_name": "USD", "rate": Decimal("80")}]
+    clock.now += 5
+    assert cache.get()[0]["USD"]["rate"] == Decimal("80")
+    assert len(db.queries) == 5
+
+
+def test_cache_reloads_every_ttl_without_version_table(clock, db):
+    db.version = None
+    cache = dm.RateCache(ttl=5, max_staleness=60)
+    cache.get()
+    clock.now += 5
+    cache.get()
+    assert sum("FROM currencies ORDER BY" in q for q in db.queries) == 2
+
+
+def test_cache_serves_old_rates_until_max_staleness(clock, db, monkeypatch):
+    cache = dm.RateCache(ttl=5, max_staleness=60)
+    table = cache.get()
+    monkeypatch.setattr(dm, "get_conn", unreachable_db)
+
+    clock.now += 30
+    assert cache.get() is table
+    # Неудачная сверка тоже откладывает следующую на ttl
+    clock.now += 2
+    assert cache.get() is table
+
+    clock.now += 30
+    with pytest.raises(psycopg2.OperationalError):
+        cache.get()
+
+
+@pytest.fixture
+def client(clock, db, monkeypatch):
+    monkeypatch.setattr(dm, "rate_cache", dm.RateCache(ttl=5, max_staleness=60))
+    return dm.app.test_client()
+
+
+def test_convert_batch_list(client):
+    response = client.post("/convert_batch", data='[{"currency": "USD", "amount": 0.1}, {"currency": "EUR", "amount": "2"}]')
+    assert response.status_code == 200
+    assert response.get_json() == {"results": [{"converted_amount": "7.55"}, {"converted_amount": "180"}]}
+
+
+def test_convert_batch_items_with_item_errors(client):
+    response = client.post("/convert_batch", json={"items": [
+        {"currency": "XXX", "amount": 1},
+        {"currency": "USD", "amount": "abc"},
+        {"currency": "USD", "amount": True},
+        {"currency": "EUR", "amount": 1},
+    ]})
+    assert response.status_code == 200
+    assert response.get_json() == {"results": [
+        {"error": "Currency not found"},
+        {"error": "Invalid amount"},
+        {"error": "Invalid amount"},
+        {"converted_amount": "90"},
+    ]}
+
+
+def test_convert_batch_columnar(client):
+    response = client.post("/convert_batch", json={"currencies": ["USD", "GBP", "EUR"], "amounts": [2, 1, "1.5"]})
+    assert response.status_code == 200
+    assert response.get_json() == {
+        "converted_amounts": ["151.0", None, "135.0"],
+        "errors": [None, "Currency not found", None],
+    }
+
+
+@pytest.mark.parametrize("body", [
+    "not json",
+    '{"currencies": ["USD"], "amounts": [1, 2]}',
+    '{"items": {"currency": "USD"}}',
+    '[{"currency": "USD"}]',
+])
+def test_convert_batch_rejects_malformed_requests(client, body):
+    assert client.post("/convert_batch", data=body).status_code == 400
+
+
+def test_convert_batch_limits_items(client, monkeypatch):
+    monkeypatch.setattr(dm, "MAX_BATCH_ITEMS", 2)
+    response = client.post("/convert_batch", json={"currencies": ["USD"] * 3, "amounts": [1] * 3})
+    assert response.status_code == 413
+    assert client.post("/convert_batch", json={"currencies": ["USD"] * 2, "amounts": [1] * 2}).status_code == 200
+
+
+def test_stale_rates_are_not_served_while_another_thread_refreshes(clock, monkeypatch):
+    monkeypatch.setattr(dm, "get_conn", unreachable_db)
+    cache = dm.RateCache(ttl=5, max_staleness=60)
+    cache.table = ({"USD": {"currency_name": "USD", "rate": 75}}, [])
+    cache.checked_at = cache.loaded_at = clock.now
+
+    # База недоступна, но курсам 30 секунд: отдаются из кэша
+    clock.now += 30
+    assert cache.get() is cache.table
+
+    # Другой поток завис в обновлении (например, на подключении к базе)
+    assert cache._refresh_lock.acquire(blocking=False)
+    try:
+        clock.now += 31
+        with pytest.raises(dm.StaleRatesError):
+            cache.get()
+    finally:
+        cache._refresh_lock.release()
+
+
+def test_connect_uses_timeout(monkeypatch):
+    calls = []
+    monkeypatch.setattr(dm.psycopg2, "connect", lambda **kwargs: calls.append(kwargs))
+    dm.get_conn()
+    assert calls[0]["connect_timeout"] == dm.DB_CONNECT_TIMEOUT
@@ -0,0 +1,76 @@
+import threading
+
+import pytest
+
+from flask_metrics import Metrics
+
+
+def test_counters_and_histograms_render():
+    metrics = Metrics(buckets=(0.1, 1.0))
+    metrics.describe("requests_total", "counter", "Запросы")
+    metrics.inc("requests_total", (("route", "/rate"),))
+    metrics.inc("requests_total", (("route", "/rate"),), 2)
+    metrics.observe("latency_seconds", 0.05)
+    metrics.observe("latency_seconds", 0.5)
+    metrics.observe("latency_seconds", 5)
+    text = metrics.render()
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{route="/rate"} 3' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1.0"} 2' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "latency_seconds_count 3" in text
+    assert "latency_seconds_sum 5.55" in text
+
+def test_threads_are_summed_after_exit():
+    metrics = Metrics()
+
+    def work():
+        for _ in range(1000):
+            metrics.inc("hits")
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    del threads, t
+    assert "hits 8000" in metrics.render()
+    assert "hits 8000" in metrics.render()
+
+def test_shards_of_finished_threads_are_folded():
+    metrics = Metrics()
+
+    def work():
+        metrics.inc("hits")
+
+    for _ in range(200):
+        t = threading.Thread(target=work)
+        t.start()
+        t.join()
+    assert len(metrics._shards) <= 1
+    assert "hits 200" in metrics.render()
+
+def test_label_escaping():
+    metrics = Metrics()
+    metrics.inc("x", (("q", 'a"b\\c'),))
+    assert 'x{q="a\\"b\\\\c"} 1' in metrics.render()
+
+def test_flask_endpoint():
+    flask = pytest.importorskip("flask")
+    from flask_metrics import install_metrics
+
+    app = flask.Flask(__name__)
+    install_metrics(app)
+
+    @app.route("/items/<int:item_id>")
+    def item(item_id):
+        return "ok"
+
+    client = app.test_client()
+    client.get("/items/1")
+    client.get("/items/2")
+    text = client.get("/metrics").get_data(as_text=True)
+    assert 'http_responses_total{route="/items/<int:item_id>",method="GET",status="200"} 2' in text
+    assert 'http_request_duration_seconds_count{route="/items/<int:item_id>",method="GET"} 2' in text
+    assert "http_requests_in_flight 1" in text
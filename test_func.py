@@ -1,5 +1,21 @@
 import unittest
-from triangle_func import get_triangle_type, IncorrectTriangleSides
+from triangle_func import (
+    get_triangle_type, classify_triangles, IncorrectTriangleSides, TRIANGLE_TYPES, INVALID
+)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Случаи из check.txt
+CHECK_CASES = [(3, 3, 3), (5, 5, 8), (6, 7, 8), (0, 1, 1), (1, 1, 3), (-1, 2, 2)]
+
+def scalar_type(a, b, c):
+    try:
+        return get_triangle_type(a, b, c)
+    except IncorrectTriangleSides:
+        return "invalid"
 
 class TestTriangleFunction(unittest.TestCase):
     def test_equilateral(self):
@@ -15,5 +31,41 @@ class TestTriangleFunction(unittest.TestCase):
         with self.assertRaises(IncorrectTriangleSides):
             get_triangle_type(0, 1, 1)
 
+@unittest.skipIf(np is None, "numpy не установлен")
+class TestClassifyTriangles(unittest.TestCase):
+    def test_matches_scalar_on_check_cases(self):
+        codes = classify_triangles(np.array(CHECK_CASES))
+        self.assertEqual([TRIANGLE_TYPES[code] for code in codes],
+                         [scalar_type(*sides) for sides in CHECK_CASES])
+
+    def test_float_input_matches_scalar(self):
+        sides = np.array(CHECK_CASES, dtype=float)
+        codes = classify_triangles(sides[:, 0], sides[:, 1], sides[:, 2])
+        self.assertEqual([TRIANGLE_TYPES[code] for code in codes],
+                         [scalar_type(*sides) for sides in CHECK_CASES])
+
+    def test_random_integers_match_scalar(self):
+        rng = np.random.default_rng(0)
+        sides = rng.integers(-2, 8, size=(2000, 3))
+        codes = classify_triangles(sides)
+        expected = [scalar_type(*map(int, row)) for row in sides]
+        self.assertEqual([TRIANGLE_TYPES[code] for code in codes], expected)
+
+    def test_large_integers_are_exact(self):
+        big = 2 ** 62
+        codes = classify_triangles(np.array([[big, big, big], [big, 1, big + 1]], dtype=np.int64))
+        self.assertEqual([TRIANGLE_TYPES[code] for code in codes], ["equilateral", "invalid"])
+
+    def test_tolerance(self):
+        sides = np.array([[1.0, 1.0 + 1e-12, 1.0], [1.0, 2.0, 3.0 - 1e-12]])
+        self.assertEqual(list(classify_triangles(sides)), [2, 3])
+        self.assertEqual(list(classify_triangles(sides, tol=1e-9)), [1, INVALID])
+
+    def test_bad_shape(self):
+        with self.assertRaises(ValueError):
+            classify_triangles(np.zeros((4, 2)))
+        with self.assertRaises(ValueError):
+            classify_triangles([1, 2], [1, 2], [1])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,77 @@
+import importlib.util
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Бюджет на собственный импорт модуля бота (миллисекунды). Сторонние
+# библиотеки импортируются заранее: их время от нашего кода не зависит
+# (один aiogram.types импортируется секундами), а в бюджет попадает только
+# то, что модуль делает сам — создание объектов, обращения к базе и т.п.
+IMPORT_TIME_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "500"))
+THIRD_PARTY = ["aiogram", "aiohttp", "requests", "psycopg2", "psycopg2.extras", "psycopg", "psycopg_pool"]
+
+# (модуль, каталог, из которого он импортируется)
+BOT_MODULES = [
+    ("bot", ROOT),
+    ("bot_rgz", ROOT),
+    ("lab5", ROOT),
+    ("lab4", os.path.join(ROOT, "lab4")),
+]
+
+# Перед импортом подменяем функции подключения к PostgreSQL:
+# любая попытка подключиться во время импорта завершает процесс с ошибкой
+IMPORT_SCRIPT = """
+import sys
+import importlib
+for name in {third_party!r}:
+    importlib.import_module(name)
+import psycopg2
+
+def forbidden_connect(*args, **kwargs):
+    sys.stderr.write("database connection at import time\\n")
+    sys.exit(3)
+
+psycopg2.connect = forbidden_connect
+try:
+    import psycopg
+    psycopg.connect = forbidden_connect
+    psycopg.AsyncConnection.connect = forbidden_connect
+except ImportError:
+    pass
+
+import {module}
+"""
+
+
+def requires(*modules):
+    missing = [name for name in modules if importlib.util.find_spec(name) is None]
+    return pytest.mark.skipif(bool(missing), reason=f"not installed: {', '.join(missing)}")
+
+
+def cumulative_import_ms(stderr, module):
+    # Строки вида "import time:   self [us] |   cumulative | imported package"
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) == 3 and parts[2].strip() == module:
+            return int(parts[1]) / 1000
+    raise AssertionError(f"no importtime entry for {module}")
+
+
+@requires("aiogram", "aiohttp", "requests", "psycopg2", "psycopg_pool")
+@pytest.mark.parametrize("module, cwd", BOT_MODULES)
+def test_import_is_fast_and_side_effect_free(module, cwd):
+    env = {k: v for k, v in os.environ.items() if k not in ("TELEGRAM_BOT_TOKEN", "BOT_TOKEN")}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT_SCRIPT.format(module=module, third_party=THIRD_PARTY)],
+        cwd=cwd, env=env, capture_output=True, text=True, timeout=60
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    assert result.stdout == ""
+    elapsed = cumulative_import_ms(result.stderr, module)
+    assert elapsed < IMPORT_TIME_BUDGET_MS, f"import {module} took {elapsed:.0f} ms"
@@ -0,0 +1,65 @@
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("werkzeug")
+import psycopg2
+
+import loadtest
+
+
+# Курсор без базы: отвечает на запросы data-maneger.py готовыми строками
+class FakeCursor:
+    def __init__(self, conn):
+        self.query = None
+
+    def execute(self, query, vars=None):
+        self.query = query
+
+    def executemany(self, query, vars_list):
+        self.query = query
+
+    def fetchone(self):
+        return {"version": 1}
+
+    def fetchall(self):
+        return [{"id": 1, "currency_name": "USD", "rate": Decimal("75")}]
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, cursor_factory):
+        self.cursor_factory = cursor_factory
+
+    def cursor(self):
+        return self.cursor_factory(self)
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_data_manager_round_trips_are_counted(monkeypatch):
+    monkeypatch.setattr(loadtest, "RealDictCursor", FakeCursor)
+    monkeypatch.setattr(psycopg2, "connect", lambda cursor_factory=None, **kwargs: FakeConnection(cursor_factory))
+    counter = loadtest.RoundTripCounter()
+    app = loadtest.load_app("data_manager", {"dbname": "loadtest"}, counter)
+
+    response = app.test_client().get("/convert?currency=USD&amount=2")
+    assert response.status_code == 200
+    assert response.get_json() == {"converted_amount": "150"}
+    assert counter.counts["data_manager"] >= 2
+
+
+def test_uncounted_db_apps_are_reported():
+    report = {"apps": {
+        "data_manager": {"requests": 10, "db_round_trips": 0},
+        "currency_manager": {"requests": 5, "db_round_trips": 7},
+        "rate_server": {"requests": 3},
+    }}
+    assert loadtest.uncounted_apps(report) == ["data_manager"]
@@ -0,0 +1,49 @@
+from membership_cache import MembershipCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_unknown_key():
+    cache = MembershipCache()
+    assert cache.get(1) is None
+
+def test_add_and_negative():
+    clock = FakeClock()
+    cache = MembershipCache(negative_ttl=30, clock=clock)
+    cache.add(1)
+    cache.add_negative(2)
+    assert cache.get(1) is True
+    assert cache.get(2) is False
+    clock.now = 31
+    assert cache.get(1) is True
+    assert cache.get(2) is None
+
+def test_add_overrides_negative():
+    cache = MembershipCache()
+    cache.add_negative(1)
+    cache.add(1)
+    assert cache.get(1) is True
+
+def test_positive_ttl():
+    clock = FakeClock()
+    cache = MembershipCache(positive_ttl=60, clock=clock)
+    cache.load(["a", "b"])
+    assert cache.get("a") is True
+    clock.now = 60
+    assert cache.get("a") is None
+
+def test_bounded_lru():
+    cache = MembershipCache(max_size=2)
+    cache.load([1, 2])
+    cache.get(1)
+    cache.add(3)
+    assert len(cache) == 2
+    assert cache.get(1) is True
+    assert cache.get(2) is None
+    assert cache.get(3) is True
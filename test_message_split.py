@@ -0,0 +1,56 @@
+import re
+
+import pytest
+
+from message_split import split_messages, text_length
+
+
+def balanced(message):
+    stack = []
+    for closing, name in re.findall(r"<(/?)(\w+)[^>]*>", message):
+        if closing:
+            assert stack and stack.pop() == name
+        else:
+            stack.append(name)
+    return not stack
+
+
+def test_short_report_is_one_message():
+    parts = ["<b>Отчет</b>\n", "строка 1\n", "строка 2\n"]
+    assert list(split_messages(parts)) == ["".join(parts)]
+
+def test_split_on_row_boundaries():
+    rows = [f"<b>{i:04d}</b> | 100.00 RUB | РАСХОД\n" for i in range(1000)]
+    messages = list(split_messages(iter(rows), limit=4096))
+    assert len(messages) > 1
+    assert "".join(messages) == "".join(rows)
+    for message in messages:
+        assert text_length(message) <= 4096
+        assert message.endswith("\n")
+        assert balanced(message)
+
+def test_wrap_is_applied_to_every_message():
+    rows = ["x" * 10 + "\n"] * 50
+    messages = list(split_messages(rows, limit=100, wrap=("<pre>", "</pre>")))
+    assert all(m.startswith("<pre>") and m.endswith("</pre>") for m in messages)
+    assert all(text_length(m) <= 100 for m in messages)
+    assert "".join(m[5:-6] for m in messages) == "".join(rows)
+
+def test_oversized_fragment_keeps_tags_balanced():
+    fragment = "<b>" + "я" * 30 + "<i>" + "&amp;" * 10 + "</i></b>"
+    messages = list(split_messages([fragment], limit=20))
+    for message in messages:
+        assert text_length(message) <= 20
+        assert balanced(message)
+        assert "&am" not in message.replace("&amp;", "")
+    plain = "".join(re.sub(r"<[^>]+>", "", m) for m in messages)
+    assert plain == "я" * 30 + "&amp;" * 10
+
+def test_utf16_length():
+    assert text_length("😀") == 2
+    messages = list(split_messages(["😀" * 3], limit=4))
+    assert messages == ["😀😀", "😀"]
+
+def test_limit_smaller_than_wrap():
+    with pytest.raises(ValueError):
+        list(split_messages(["a"], limit=5, wrap=("<pre>", "</pre>")))
@@ -0,0 +1,41 @@
+import io
+from datetime import date
+from decimal import Decimal
+
+from operations_import import iter_operations
+
+
+def parse(text):
+    return list(iter_operations(io.StringIO(text, newline="")))
+
+
+def test_csv_with_header():
+    rows = parse("date,sum,type,category\n2024-01-15,100.50,РАСХОД,еда\n2024-01-16,5000,доход,зарплата\n")
+    assert rows == [
+        (2, (date(2024, 1, 15), Decimal("100.50"), "РАСХОД", "еда"), None),
+        (3, (date(2024, 1, 16), Decimal("5000"), "ДОХОД", "зарплата"), None),
+    ]
+
+def test_tsv_and_decimal_comma():
+    rows = parse("2024-01-15\t100,50\texpense\tеда\n\n2024-02-01\t7\tINCOME\tподарки\n")
+    assert [row[1][1] for row in rows] == [Decimal("100.50"), Decimal("7")]
+    assert [row[1][2] for row in rows] == ["РАСХОД", "ДОХОД"]
+
+def test_semicolon():
+    rows = parse("2024-01-15;1 000,25;РАСХОД;дом, ремонт\n")
+    assert rows == [(1, (date(2024, 1, 15), Decimal("1000.25"), "РАСХОД", "дом, ремонт"), None)]
+
+def test_errors():
+    rows = parse(
+        "2024-01-15,100,РАСХОД,еда\n"
+        "2024-13-01,100,РАСХОД,еда\n"
+        "2024-01-15,abc,РАСХОД,еда\n"
+        "2024-01-15,-5,РАСХОД,еда\n"
+        "2024-01-15,NaN,РАСХОД,еда\n"
+        "2024-01-15,100,ПЕРЕВОД,еда\n"
+        "2024-01-15,100,РАСХОД,\n"
+        "2024-01-15,100\n"
+    )
+    assert rows[0][2] is None
+    assert [line_no for line_no, operation, error in rows if error] == [2, 3, 4, 5, 6, 7, 8]
+    assert all(operation is None for _, operation, error in rows if error)
@@ -0,0 +1,33 @@
+from datetime import date
+
+import pytest
+
+from report_period import covers_whole_months, parse_report_args
+
+TODAY = date(2024, 3, 15)
+
+
+@pytest.mark.parametrize("args, expected", [
+    ("month", ("RUB", date(2024, 3, 1), TODAY, "day")),
+    ("month month usd", ("USD", date(2024, 3, 1), TODAY, "month")),
+    ("30d week", ("RUB", date(2024, 2, 15), TODAY, "week")),
+    ("2024-02 category EUR", ("EUR", date(2024, 2, 1), date(2024, 2, 29), "category")),
+    ("2023 month", ("RUB", date(2023, 1, 1), date(2023, 12, 31), "month")),
+    ("2024-01-10 2024-03-05 week", ("RUB", date(2024, 1, 10), date(2024, 3, 5), "week")),
+    ("2024-01-10 month 2024-03-05", ("RUB", date(2024, 1, 10), date(2024, 3, 5), "month")),
+])
+def test_parse(args, expected):
+    assert parse_report_args(args, TODAY) == expected
+
+@pytest.mark.parametrize("args", [
+    "", "week", "30d 2024-01", "2024-01-10", "2024-03-05 2024-01-10",
+    "2024-13", "0d", "month week day", "yesterday",
+])
+def test_parse_errors(args):
+    with pytest.raises(ValueError):
+        parse_report_args(args, TODAY)
+
+def test_covers_whole_months():
+    assert covers_whole_months(date(2024, 1, 1), date(2024, 2, 29))
+    assert not covers_whole_months(date(2024, 1, 1), date(2024, 2, 28))
+    assert not covers_whole_months(date(2024, 1, 2), date(2024, 1, 31))
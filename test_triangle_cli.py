@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import triangle_cli
+from test_func import CHECK_CASES, scalar_type
+
+
+def run_cli(capsys, *argv):
+    assert triangle_cli.main([str(arg) for arg in argv]) == 0
+    return json.loads(capsys.readouterr().out)
+
+def test_csv_in_chunks(tmp_path, capsys):
+    src = tmp_path / "sides.csv"
+    src.write_text("a,b,c\n" + "".join(f"{a},{b},{c}\n" for a, b, c in CHECK_CASES))
+    out = tmp_path / "types.txt"
+    counts = run_cli(capsys, src, "-o", out, "--skip-header", "--chunk-size", 4)
+    assert out.read_text().split() == [scalar_type(*sides) for sides in CHECK_CASES]
+    assert counts == {"total": 6, "invalid": 3, "equilateral": 1, "isosceles": 1, "nonequilateral": 1,
+                      "malformed": 0}
+
+def test_blank_and_malformed_lines_keep_positions(tmp_path, capsys):
+    src = tmp_path / "sides.txt"
+    src.write_text("3 4 5\n\n2 2 2\n1 2\nx 1 1\n2 2 3\n")
+    out = tmp_path / "types.txt"
+    assert triangle_cli.main([str(src), "-o", str(out), "--chunk-size", "3"]) == 0
+    captured = capsys.readouterr()
+    counts = json.loads(captured.out)
+    assert out.read_text().split() == [
+        "nonequilateral", "invalid", "equilateral", "invalid", "invalid", "isosceles",
+    ]
+    assert counts["total"] == 6
+    assert counts["malformed"] == 3
+    err = captured.err
+    assert "Блок 1, строка 2: пустая строка" in err
+    assert "Блок 2, строка 4" in err
+    assert "Блок 2, строка 5" in err
+
+def test_binary_with_process_pool(tmp_path, capsys):
+    rng = np.random.default_rng(1)
+    sides = rng.integers(-1, 6, size=(1000, 3)).astype(np.int64)
+    src = tmp_path / "sides.bin"
+    sides.tofile(src)
+    out = tmp_path / "codes.bin"
+    counts = run_cli(capsys, src, "-o", out, "--dtype", "int64", "--chunk-size", 128,
+                     "--workers", 2, "--output-format", "codes")
+    codes = np.fromfile(out, dtype=np.uint8)
+    assert codes.tolist() == triangle_cli.classify_triangles(sides).tolist()
+    assert counts["total"] == 1000
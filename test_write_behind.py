@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from write_behind import WriteBehindBuffer
+
+
+class Recorder:
+    def __init__(self):
+        self.batches = []
+
+    async def __call__(self, rows):
+        self.batches.append(list(rows))
+        await asyncio.sleep(0)
+        return [ValueError(row) if row == "bad" else row.upper() for row in rows]
+
+
+def test_batches_by_size_and_results():
+    async def run():
+        flush = Recorder()
+        buffer = WriteBehindBuffer(flush, max_rows=3, max_delay=10)
+        buffer.start()
+        results = await asyncio.gather(*(buffer.submit(row) for row in "abcdef"))
+        await buffer.close()
+        return flush.batches, results, buffer.stats()
+
+    batches, results, stats = asyncio.run(run())
+    assert batches == [["a", "b", "c"], ["d", "e", "f"]]
+    assert results == list("ABCDEF")
+    assert stats["batches"] == 2 and stats["rows"] == 6 and stats["max_batch"] == 3
+    assert stats["batch_sizes"] == {"<=5": 2}
+
+def test_flush_after_delay():
+    async def run():
+        flush = Recorder()
+        buffer = WriteBehindBuffer(flush, max_rows=100, max_delay=0.01)
+        buffer.start()
+        result = await asyncio.wait_for(buffer.submit("x"), 1)
+        await buffer.close()
+        return flush.batches, result
+
+    assert asyncio.run(run()) == ([["x"]], "X")
+
+def test_row_errors_and_batch_errors():
+    async def run():
+        buffer = WriteBehindBuffer(Recorder(), max_rows=2, max_delay=10)
+        buffer.start()
+        ok, bad = await asyncio.gather(buffer.submit("ok"), buffer.submit("bad"), return_exceptions=True)
+        await buffer.close()
+
+        async def broken(rows):
+            raise RuntimeError("db down")
+
+        failing = WriteBehindBuffer(broken, max_rows=2, max_delay=10)
+        failing.start()
+        errors = await asyncio.gather(failing.submit(1), failing.submit(2), return_exceptions=True)
+        await failing.close()
+        return ok, bad, errors
+
+    ok, bad, errors = asyncio.run(run())
+    assert ok == "OK"
+    assert isinstance(bad, ValueError)
+    assert all(isinstance(e, RuntimeError) for e in errors)
+
+def test_close_flushes_pending_rows():
+    async def run():
+        flush = Recorder()
+        buffer = WriteBehindBuffer(flush, max_rows=100, max_delay=60)
+        buffer.start()
+        pending = [asyncio.create_task(buffer.submit(row)) for row in "xyz"]
+        await asyncio.sleep(0)
+        await buffer.close()
+        with pytest.raises(RuntimeError):
+            await buffer.submit("late")
+        return flush.batches, [task.result() for task in pending]
+
+    assert asyncio.run(run()) == ([["x", "y", "z"]], ["X", "Y", "Z"])
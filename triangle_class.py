@@ -1,21 +1,117 @@
+from array import array
+
 class IncorrectTriangleSides(Exception):
     pass
 
+def _is_valid(a, b, c):
+    return not (a <= 0 or b <= 0 or c <= 0 or a + b <= c or a + c <= b or b + c <= a)
+
+def _triangle_type(a, b, c):
+    if a == b == c:
+        return "equilateral"
+    elif a == b or a == c or b == c:
+        return "isosceles"
+    else:
+        return "nonequilateral"
+
 class Triangle:
+    __slots__ = ("a", "b", "c")
+
     def __init__(self, a, b, c):
-        if a <= 0 or b <= 0 or c <= 0 or a + b <= c or a + c <= b or b + c <= a:
+        if not _is_valid(a, b, c):
             raise IncorrectTriangleSides("Некорректные длины сторон")
         self.a = a
         self.b = b
         self.c = c
 
     def triangle_type(self):
-        if self.a == self.b == self.c:
-            return "equilateral"
-        elif self.a == self.b or self.a == self.c or self.b == self.c:
-            return "isosceles"
-        else:
-            return "nonequilateral"
+        return _triangle_type(self.a, self.b, self.c)
 
     def perimeter(self):
-        return self.a + self.b + self.c
\ No newline at end of file
+        return self.a + self.b + self.c
+
+# Набор треугольников, хранящийся по столбцам: стороны лежат в трех
+# непрерывных типизированных массивах (array.array), по 8 байт на сторону
+# при typecode "d" (float) или "q" (int64). Операции над набором не создают
+# объект Triangle на каждую строку.
+class TriangleBatch:
+    __slots__ = ("a", "b", "c")
+
+    def __init__(self, a=(), b=(), c=(), typecode="d", validate=True):
+        self.a = array(typecode, a)
+        self.b = array(typecode, b)
+        self.c = array(typecode, c)
+        if not len(self.a) == len(self.b) == len(self.c):
+            raise ValueError("Массивы сторон должны быть одинаковой длины")
+        if validate:
+            self.validate()
+
+    @classmethod
+    def from_triples(cls, triples, typecode="d", validate=True):
+        batch = cls(typecode=typecode, validate=False)
+        append_a, append_b, append_c = batch.a.append, batch.b.append, batch.c.append
+        for a, b, c in triples:
+            append_a(a)
+            append_b(b)
+            append_c(c)
+        if validate:
+            batch.validate()
+        return batch
+
+    @classmethod
+    def _from_arrays(cls, a, b, c):
+        batch = cls.__new__(cls)
+        batch.a, batch.b, batch.c = a, b, c
+        return batch
+
+    @property
+    def typecode(self):
+        return self.a.typecode
+
+    def __len__(self):
+        return len(self.a)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._from_arrays(self.a[index], self.b[index], self.c[index])
+        return Triangle(self.a[index], self.b[index], self.c[index])
+
+    def __iter__(self):
+        for a, b, c in zip(self.a, self.b, self.c):
+            yield Triangle(a, b, c)
+
+    def append(self, a, b, c):
+        if not _is_valid(a, b, c):
+            raise IncorrectTriangleSides("Некорректные длины сторон")
+        self.a.append(a)
+        self.b.append(b)
+        self.c.append(c)
+
+    # Номера строк с некорректными сторонами
+    def invalid_rows(self):
+        return [i for i, (a, b, c) in enumerate(zip(self.a, self.b, self.c)) if not _is_valid(a, b, c)]
+
+    def validate(self):
+        for i, (a, b, c) in enumerate(zip(self.a, self.b, self.c)):
+            if not _is_valid(a, b, c):
+                raise IncorrectTriangleSides(f"Некорректные длины сторон в строке {i}")
+
+    def perimeters(self):
+        return array(self.typecode, [a + b + c for a, b, c in zip(self.a, self.b, self.c)])
+
+    def types(self):
+        return [_triangle_type(a, b, c) for a, b, c in zip(self.a, self.b, self.c)]
+
+    # Новый набор из строк заданного типа ("equilateral", "isosceles", ...)
+    def filter(self, triangle_type):
+        return self.select(t == triangle_type for t in self.types())
+
+    # Новый набор из строк, для которых mask истинна
+    def select(self, mask):
+        a, b, c = (array(self.typecode) for _ in range(3))
+        for keep, x, y, z in zip(mask, self.a, self.b, self.c):
+            if keep:
+                a.append(x)
+                b.append(y)
+                c.append(z)
+        return self._from_arrays(a, b, c)
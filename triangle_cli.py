@@ -0,0 +1,211 @@
+import argparse
+import itertools
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from triangle_func import classify_triangles, TRIANGLE_TYPES, INVALID
+
+# Потоковая классификация треугольников из файла.
+# Входные форматы:
+#   csv    — строки "a,b,c"
+#   text   — строки "a b c" (разделитель — пробелы)
+#   binary — сырой массив чисел (--dtype), по три стороны подряд
+#   npy    — массив NumPy формы (N, 3), читается через memory map
+# Файл обрабатывается блоками по --chunk-size строк; одновременно в работе
+# не больше 2 * --workers блоков, поэтому память не зависит от размера входа.
+# В выходной файл пишется результат по каждой строке (названия типов или
+# коды uint8), счетчики типов печатаются в stdout в формате JSON.
+# Строка результата k всегда соответствует строке входа k: пустые и
+# некорректные строки csv/text получают тип invalid, считаются в поле
+# malformed, а первые из них печатаются в stderr с номером блока и строки.
+
+DEFAULT_CHUNK_SIZE = 1_000_000
+MAX_REPORTED_ERRORS = 10
+TYPE_NAMES = np.array(TRIANGLE_TYPES)
+
+
+def detect_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return "csv"
+    if ext == ".npy":
+        return "npy"
+    if ext in (".bin", ".raw", ".dat"):
+        return "binary"
+    return "text"
+
+
+def parse_lines(lines, delimiter):
+    sides = np.loadtxt(lines, delimiter=delimiter, ndmin=2)
+    if sides.size and sides.shape[1] != 3:
+        raise ValueError(f"Ожидается по три стороны в строке, получено {sides.shape[1]}")
+    return sides.reshape(-1, 3)
+
+
+def parse_line(line, delimiter):
+    fields = line.split(delimiter)
+    if len(fields) != 3:
+        raise ValueError(f"ожидается три стороны, получено {len(fields)}")
+    try:
+        return [float(field) for field in fields]
+    except ValueError:
+        raise ValueError(f"не число: {line.strip()[:80]!r}")
+
+
+# Блок строк текстового входа; first_line — номер первой строки блока в файле.
+# Обычно блок разбирается одним np.loadtxt; если в нем есть некорректная
+# строка, строки разбираются по одной. Возвращает (коды, число некорректных
+# строк, первые MAX_REPORTED_ERRORS из них как (номер строки, причина))
+def classify_text_chunk(lines, delimiter, first_line, tol):
+    blank = [i for i, line in enumerate(lines) if not line or line.isspace()]
+    errors = [(i, "пустая строка") for i in blank]
+    if blank:
+        skipped = set(blank)
+        rows = [i for i in range(len(lines)) if i not in skipped]
+    else:
+        rows = range(len(lines))
+    try:
+        sides = parse_lines(lines if not blank else [lines[i] for i in rows], delimiter) if rows else None
+    except ValueError:
+        parsed = []
+        for i in rows:
+            try:
+                parsed.append((i, parse_line(lines[i], delimiter)))
+            except ValueError as e:
+                errors.append((i, str(e)))
+        rows = [i for i, _ in parsed]
+        sides = np.array([row for _, row in parsed], dtype=np.float64).reshape(-1, 3)
+    if not errors:
+        codes = classify_triangles(sides, tol=tol)
+    else:
+        codes = np.full(len(lines), INVALID, dtype=np.uint8)
+        if rows:
+            codes[rows] = classify_triangles(sides, tol=tol)
+    errors.sort()
+    examples = [(first_line + i, reason) for i, reason in errors[:MAX_REPORTED_ERRORS]]
+    return codes, len(errors), examples
+
+
+def open_array(path, fmt, dtype):
+    if fmt == "npy":
+        sides = np.load(path, mmap_mode="r")
+    else:
+        sides = np.memmap(path, dtype=dtype, mode="r")
+        if sides.size % 3:
+            raise ValueError("Размер файла не кратен трем сторонам")
+    return sides.reshape(-1, 3)
+
+
+# Рабочий процесс открывает файл сам: между процессами передаются только границы блока
+def classify_array_chunk(path, fmt, dtype, start, stop, tol):
+    sides = open_array(path, fmt, dtype)
+    return classify_triangles(np.ascontiguousarray(sides[start:stop]), tol=tol), 0, []
+
+
+def iter_text_chunks(path, delimiter, chunk_size, skip_header):
+    with open(path, encoding="utf-8") as f:
+        first_line = 1
+        if skip_header:
+            next(f, None)
+            first_line = 2
+        while True:
+            lines = list(itertools.islice(f, chunk_size))
+            if not lines:
+                return
+            yield (classify_text_chunk, lines, delimiter, first_line)
+            first_line += len(lines)
+
+
+def iter_array_chunks(path, fmt, dtype, chunk_size):
+    total = len(open_array(path, fmt, dtype))
+    for start in range(0, total, chunk_size):
+        yield (classify_array_chunk, path, fmt, dtype, start, min(start + chunk_size, total))
+
+
+def write_result(out, codes, output_format):
+    if output_format == "codes":
+        out.write(codes.tobytes())
+    elif len(codes):
+        out.write(("\n".join(TYPE_NAMES[codes]) + "\n").encode())
+
+
+# Возвращает (счетчики по типам, число некорректных строк)
+def run(tasks, out, output_format, tol, workers):
+    counts = np.zeros(len(TRIANGLE_TYPES), dtype=np.int64)
+    malformed = 0
+    chunk_numbers = itertools.count(1)
+
+    def consume(result):
+        nonlocal malformed
+        codes, bad, examples = result
+        chunk = next(chunk_numbers)
+        for line_no, reason in examples[:max(0, MAX_REPORTED_ERRORS - malformed)]:
+            print(f"Блок {chunk}, строка {line_no}: {reason}", file=sys.stderr)
+        malformed += bad
+        counts[:] += np.bincount(codes, minlength=len(TRIANGLE_TYPES))
+        write_result(out, codes, output_format)
+
+    if workers <= 1:
+        for func, *args in tasks:
+            consume(func(*args, tol))
+        return counts, malformed
+
+    # Ограниченное окно задач: результаты пишутся строго в порядке входа
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for func, *args in tasks:
+            pending.append(pool.submit(func, *args, tol))
+            if len(pending) >= 2 * workers:
+                consume(pending.popleft().result())
+        while pending:
+            consume(pending.popleft().result())
+    return counts, malformed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Потоковая классификация треугольников из файла")
+    parser.add_argument("input", help="входной файл")
+    parser.add_argument("-o", "--output", required=True, help="файл для результатов по строкам")
+    parser.add_argument("--format", choices=["csv", "text", "binary", "npy"],
+                        help="формат входа (по умолчанию — по расширению файла)")
+    parser.add_argument("--dtype", default="float64", help="тип чисел для формата binary")
+    parser.add_argument("--skip-header", action="store_true", help="пропустить первую строку csv/text")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="строк в блоке")
+    parser.add_argument("--workers", type=int, default=1, help="число процессов (по умолчанию 1)")
+    parser.add_argument("--tol", type=float, default=None, help="допуск сравнения для дробных сторон")
+    parser.add_argument("--output-format", choices=["names", "codes"], default="names",
+                        help="names — название типа в строке, codes — байт uint8 на треугольник")
+    parser.add_argument("--counts", help="дополнительно сохранить счетчики в JSON-файл")
+    args = parser.parse_args(argv)
+
+    if args.chunk_size <= 0:
+        parser.error("--chunk-size должен быть положительным")
+
+    fmt = args.format or detect_format(args.input)
+    if fmt in ("csv", "text"):
+        delimiter = "," if fmt == "csv" else None
+        tasks = iter_text_chunks(args.input, delimiter, args.chunk_size, args.skip_header)
+    else:
+        tasks = iter_array_chunks(args.input, fmt, np.dtype(args.dtype), args.chunk_size)
+
+    with open(args.output, "wb") as out:
+        counts, malformed = run(tasks, out, args.output_format, args.tol, args.workers)
+
+    summary = {"total": int(counts.sum())}
+    summary.update({name: int(count) for name, count in zip(TRIANGLE_TYPES, counts)})
+    summary["malformed"] = malformed
+    if args.counts:
+        with open(args.counts, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+    json.dump(summary, sys.stdout)
+    sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
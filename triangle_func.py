@@ -10,4 +10,56 @@ def get_triangle_type(a: int, b: int, c: int) -> str:
         return "isosceles"
     else:
         return "nonequilateral"
-    
\ No newline at end of file
+
+# Коды типов в результате classify_triangles; TRIANGLE_TYPES[код] — название
+INVALID = 0
+EQUILATERAL = 1
+ISOSCELES = 2
+NONEQUILATERAL = 3
+TRIANGLE_TYPES = ("invalid", "equilateral", "isosceles", "nonequilateral")
+
+# Пакетная классификация: sides — массив формы (N, 3) либо три массива
+# одинаковой длины (a, b, c). Возвращает массив uint8 с кодами типов;
+# некорректные треугольники получают код INVALID вместо исключения.
+# Целочисленный ввод сравнивается точно (в int64), для дробного ввода можно
+# задать допуск tol: стороны считаются равными при |x - y| <= tol, а
+# треугольник с a + b <= c + tol — вырожденным.
+def classify_triangles(a, b=None, c=None, tol=None):
+    import numpy as np
+
+    if b is None and c is None:
+        sides = np.asarray(a)
+        if sides.ndim != 2 or sides.shape[1] != 3:
+            raise ValueError("Ожидается массив сторон формы (N, 3)")
+        a, b, c = sides[:, 0], sides[:, 1], sides[:, 2]
+    elif b is None or c is None:
+        raise ValueError("Нужно передать либо массив (N, 3), либо три массива сторон")
+    else:
+        a, b, c = np.asarray(a), np.asarray(b), np.asarray(c)
+        if a.ndim != 1 or a.shape != b.shape or a.shape != c.shape:
+            raise ValueError("Массивы сторон должны быть одномерными и одинаковой длины")
+
+    if all(np.issubdtype(x.dtype, np.integer) for x in (a, b, c)):
+        # Точный путь: после проверки положительности неравенство a + b > c
+        # проверяется как a > c - b, разность положительных int64 не переполняется
+        a, b, c = (x.astype(np.int64, copy=False) for x in (a, b, c))
+        valid = (a > 0) & (b > 0) & (c > 0)
+        valid &= (a > c - b) & (a > b - c) & (b > a - c)
+        eq_ab, eq_bc, eq_ac = a == b, b == c, a == c
+    else:
+        a, b, c = (x.astype(np.float64, copy=False) for x in (a, b, c))
+        tol = 0.0 if tol is None else float(tol)
+        valid = (a > 0) & (b > 0) & (c > 0)
+        valid &= (a + b > c + tol) & (a + c > b + tol) & (b + c > a + tol)
+        if tol:
+            eq_ab = np.abs(a - b) <= tol
+            eq_bc = np.abs(b - c) <= tol
+            eq_ac = np.abs(a - c) <= tol
+        else:
+            eq_ab, eq_bc, eq_ac = a == b, b == c, a == c
+
+    result = np.full(a.shape, NONEQUILATERAL, dtype=np.uint8)
+    result[eq_ab | eq_bc | eq_ac] = ISOSCELES
+    result[eq_ab & eq_bc] = EQUILATERAL
+    result[~valid] = INVALID
+    return result
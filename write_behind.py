@@ -0,0 +1,114 @@
+import asyncio
+import time
+from bisect import bisect_left
+
+# Буфер отложенной записи: строки от всех чатов копятся и записываются
+# одной пачкой, когда набралось max_rows строк или прошло max_delay секунд
+# с появления первой строки в буфере. submit() возвращает управление только
+# после того, как пачка со строкой записана (транзакция зафиксирована), так
+# что пользователю можно отвечать сразу после него.
+#
+# flush(rows) — корутина, которая записывает пачку и возвращает список
+# результатов по строкам; результат-исключение передается в submit()
+# соответствующей строки. Исключение из самой flush получают все строки пачки.
+
+BATCH_SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class WriteBehindBuffer:
+    def __init__(self, flush, max_rows=500, max_delay=0.05, clock=time.perf_counter):
+        self.flush = flush
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self.clock = clock
+        self._rows = []
+        self._futures = []
+        self._wakeup = asyncio.Event()
+        self._full = asyncio.Event()
+        self._closed = False
+        self._task = None
+        # Метрики: число пачек, строк, распределение размеров пачек
+        self.batches = 0
+        self.rows_written = 0
+        self.max_batch = 0
+        self.flush_seconds = 0.0
+        self.batch_size_counts = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def submit(self, row):
+        if self._closed:
+            raise RuntimeError("Буфер записи закрыт")
+        future = asyncio.get_running_loop().create_future()
+        self._rows.append(row)
+        self._futures.append(future)
+        self._wakeup.set()
+        if len(self._rows) >= self.max_rows:
+            self._full.set()
+        return await future
+
+    # Записывает все, что осталось в буфере, и останавливает фоновую задачу
+    async def close(self):
+        self._closed = True
+        self._wakeup.set()
+        self._full.set()
+        if self._task is not None:
+            await self._task
+        else:
+            await self._flush_pending()
+
+    async def _run(self):
+        while not (self._closed and not self._rows):
+            await self._wakeup.wait()
+            if not self._closed:
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.max_delay)
+                except asyncio.TimeoutError:
+                    pass
+            await self._flush_pending()
+
+    async def _flush_pending(self):
+        rows, futures = self._rows[:self.max_rows], self._futures[:self.max_rows]
+        del self._rows[:self.max_rows]
+        del self._futures[:self.max_rows]
+        if not self._rows:
+            self._wakeup.clear()
+        if len(self._rows) < self.max_rows:
+            self._full.clear()
+        if not rows:
+            return
+
+        start = self.clock()
+        try:
+            results = await self.flush(rows)
+        except Exception as e:
+            results = [e] * len(rows)
+        self._record(len(rows), self.clock() - start)
+
+        for future, result in zip(futures, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def _record(self, size, elapsed):
+        self.batches += 1
+        self.rows_written += size
+        self.max_batch = max(self.max_batch, size)
+        self.flush_seconds += elapsed
+        self.batch_size_counts[bisect_left(BATCH_SIZE_BUCKETS, size)] += 1
+
+    def stats(self):
+        labels = [f"<={bound}" for bound in BATCH_SIZE_BUCKETS] + [f">{BATCH_SIZE_BUCKETS[-1]}"]
+        return {
+            "batches": self.batches,
+            "rows": self.rows_written,
+            "avg_batch": round(self.rows_written / self.batches, 2) if self.batches else 0,
+            "max_batch": self.max_batch,
+            "avg_flush_ms": round(self.flush_seconds * 1000 / self.batches, 3) if self.batches else 0,
+            "batch_sizes": {label: count for label, count in zip(labels, self.batch_size_counts) if count},
+            "pending": len(self._rows),
+        }